@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class ProfileModelBackend(ModelBackend):
+    """ModelBackend, загружающий профиль вместе с пользователем"""
+
+    def get_user(self, user_id):
+        """Получает пользователя сессии одним JOIN с userprofile"""
+        try:
+            user = UserModel._default_manager.select_related("userprofile").get(
+                pk=user_id
+            )
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
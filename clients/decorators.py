@@ -0,0 +1,31 @@
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+
+def parent_required(view_func=None, *, ajax=False):
+    """Доступ только для родителей (включает login_required)
+
+    Профиль загружается вместе с пользователем (ProfileModelBackend),
+    поэтому проверка роли не делает отдельного запроса.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            profile = getattr(request.user, "userprofile", None)
+            if profile is None or not profile.is_parent:
+                if ajax:
+                    return JsonResponse({"error": "Zugriff verweigert"}, status=403)
+                messages.error(request, "Zugriff verweigert.")
+                return redirect("login")
+            return view(request, *args, **kwargs)
+
+        return login_required(wrapped)
+
+    if view_func is not None:
+        return decorator(view_func)
+    return decorator
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:40
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clients", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # auth_user принадлежит django.contrib.auth, поэтому индекс для
+    # сортировки по имени (списки детей/позиций контракта) создается SQL
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS clients_auth_user_first_name_idx "
+            "ON auth_user (first_name);",
+            "DROP INDEX IF EXISTS clients_auth_user_first_name_idx;",
+        ),
+    ]
@@ -4,7 +4,7 @@ from datetime import date, timedelta
 from django.contrib import messages
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q, Sum
+from django.db.models import Count, Prefetch, Q, Sum
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.decorators import method_decorator
@@ -14,6 +14,7 @@ from contracts.models import Contract, ContractChangeRequest, ContractItem
 from lessons.models import (
     AbsenceHistory,
     ActualLesson,
+    AttendanceRecord,
     Group,
     GroupEnrollment,
     TrialLesson,
@@ -192,20 +193,31 @@ class ChildDashboardView(DashboardView):
             weekly_schedule, key=lambda x: (x["schedule"].weekday, x["time"])
         )
 
-        # Последние занятия
-        recent_lessons = ActualLesson.objects.filter(
-            group__in=[e.group for e in active_enrollments],
-            scheduled_date__gte=date.today() - timedelta(days=30),
-        ).order_by("-scheduled_date")[:10]
+        # Последние занятия; записи посещаемости ребенка подгружаются одним запросом
+        recent_lessons = (
+            ActualLesson.objects.filter(
+                group__in=[e.group for e in active_enrollments],
+                scheduled_date__gte=date.today() - timedelta(days=30),
+            )
+            .list_fields()
+            .order_by("-scheduled_date")
+            .prefetch_related(
+                Prefetch(
+                    "attendance_records",
+                    queryset=AttendanceRecord.objects.filter(child=child),
+                    to_attr="child_attendance",
+                )
+            )[:10]
+        )
         context["recent_lessons"] = recent_lessons
 
         # История посещаемости
-        attendance_records = []
-        for lesson in recent_lessons:
-            attendance = lesson.attendance_records.filter(child=child).first()
-            if attendance:
-                attendance_records.append({"lesson": lesson, "attendance": attendance})
-        context["attendance_records"] = attendance_records[:10]
+        attendance_records = [
+            {"lesson": lesson, "attendance": lesson.child_attendance[0]}
+            for lesson in recent_lessons
+            if lesson.child_attendance
+        ]
+        context["attendance_records"] = attendance_records
 
         # История пропусков
         absence_history = AbsenceHistory.objects.filter(
@@ -258,20 +270,28 @@ class TeacherDashboardView(DashboardView):
 
         # Сегодняшние занятия
         today = date.today()
-        today_lessons = ActualLesson.objects.filter(
-            Q(scheduled_teacher=user) | Q(actual_teacher=user),
-            scheduled_date__date=today,
-        ).order_by("scheduled_date")
+        today_lessons = (
+            ActualLesson.objects.filter(
+                Q(scheduled_teacher=user) | Q(actual_teacher=user),
+                scheduled_date__date=today,
+            )
+            .list_fields()
+            .order_by("scheduled_date")
+        )
         context["today_lessons"] = today_lessons
 
         # Занятия на этой неделе
         week_start = today - timedelta(days=today.weekday())
         week_end = week_start + timedelta(days=6)
 
-        week_lessons = ActualLesson.objects.filter(
-            Q(scheduled_teacher=user) | Q(actual_teacher=user),
-            scheduled_date__date__range=[week_start, week_end],
-        ).order_by("scheduled_date")
+        week_lessons = (
+            ActualLesson.objects.filter(
+                Q(scheduled_teacher=user) | Q(actual_teacher=user),
+                scheduled_date__date__range=[week_start, week_end],
+            )
+            .list_fields()
+            .order_by("scheduled_date")
+        )
         context["week_lessons"] = week_lessons
 
         # Ожидающие отметки занятия
@@ -296,16 +316,13 @@ class TeacherDashboardView(DashboardView):
             scheduled_date__year=today.year,
         ).count()
 
-        substitutions_this_month = (
-            ActualLesson.objects.filter(
-                actual_teacher=user,
-                status="conducted",
-                scheduled_date__month=today.month,
-                scheduled_date__year=today.year,
-            )
-            .exclude(scheduled_teacher=user)
-            .count()
-        )
+        substitutions_this_month = ActualLesson.objects.filter(
+            actual_teacher=user,
+            status="conducted",
+            was_substituted=True,
+            scheduled_date__month=today.month,
+            scheduled_date__year=today.year,
+        ).count()
 
         context.update(
             {
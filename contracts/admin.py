@@ -1,6 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
 from django.db.models import Count, Sum
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
@@ -201,7 +203,7 @@ class ContractAdmin(admin.ModelAdmin):
     def get_monthly_total(self, obj):
         """Получает общую ежемесячную сумму"""
         try:
-            total = obj.total_monthly_amount()
+            total = obj.total_monthly_amount
             if total is not None:
                 # Безопасное преобразование в float
                 total_amount = float(total)
@@ -271,6 +273,9 @@ class ContractItemAdmin(admin.ModelAdmin):
     def activate_items(self, request, queryset):
         """Активирует позиции"""
         updated = queryset.update(is_active=True)
+        Contract.objects.filter(
+            pk__in=queryset.values("contract_id")
+        ).refresh_monthly_amounts()
         self.message_user(request, f"{updated} Positionen wurden aktiviert.")
 
     activate_items.short_description = "Positionen aktivieren"
@@ -278,6 +283,9 @@ class ContractItemAdmin(admin.ModelAdmin):
     def deactivate_items(self, request, queryset):
         """Деактивирует позиции"""
         updated = queryset.update(is_active=False)
+        Contract.objects.filter(
+            pk__in=queryset.values("contract_id")
+        ).refresh_monthly_amounts()
         self.message_user(request, f"{updated} Positionen wurden deaktiviert.")
 
     deactivate_items.short_description = "Positionen deaktivieren"
@@ -466,7 +474,7 @@ class InvoiceAdmin(admin.ModelAdmin):
 
     def mark_as_sent(self, request, queryset):
         """Отмечает счета как отправленные"""
-        updated = queryset.update(status="sent")
+        updated = queryset.update(status="sent", updated_at=timezone.now())
         self.message_user(
             request, f"{updated} Rechnungen wurden als gesendet markiert."
         )
@@ -477,7 +485,9 @@ class InvoiceAdmin(admin.ModelAdmin):
         """Отмечает счета как оплаченные"""
         from datetime import date
 
-        updated = queryset.update(status="paid", paid_date=date.today())
+        updated = queryset.update(
+            status="paid", paid_date=date.today(), updated_at=timezone.now()
+        )
         self.message_user(request, f"{updated} Rechnungen wurden als bezahlt markiert.")
 
     mark_as_paid.short_description = "Als bezahlt markieren"
@@ -561,3 +571,19 @@ class PaymentPlanAdmin(admin.ModelAdmin):
     list_filter = ("is_active", "start_date")
     search_fields = ("debt__parent__first_name", "debt__parent__last_name")
     inlines = [PaymentPlanInstallmentInline]
+
+    actions = ["create_installments"]
+
+    def create_installments(self, request, queryset):
+        """Создает график рат для планов без рат"""
+        created = 0
+        for plan in queryset.filter(installments__isnull=True):
+            try:
+                created += len(plan.create_installments())
+            except ValidationError as error:
+                self.message_user(
+                    request, f"{plan}: {' '.join(error.messages)}", level=messages.ERROR
+                )
+        self.message_user(request, f"{created} Raten wurden erstellt.")
+
+    create_installments.short_description = "Ratenplan erstellen"
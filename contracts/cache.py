@@ -0,0 +1,91 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+
+ACTIVE_DISCOUNTS_KEY = "discounts:{}"
+ACTIVE_SUBJECTS_KEY = "subjects_active"
+SUBJECT_CATALOG_KEY = "subjects_catalog"
+ACTIVE_SUBJECTS_TIMEOUT = 300
+SUBJECT_PRICE_KEY = "subject_price:{}:{}"
+
+
+def _seconds_until_midnight():
+    """Секунды до конца текущего дня"""
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), time.min)
+    return max(int((tomorrow - datetime.now()).total_seconds()), 1)
+
+
+def get_active_discounts_cached():
+    """Список действующих сегодня скидок (кэшируется до конца дня)"""
+    from .models import Discount
+
+    today = date.today()
+
+    def load():
+        return list(Discount.objects.active_on(today).select_related("discount_type"))
+
+    return cache.get_or_set(
+        ACTIVE_DISCOUNTS_KEY.format(today.isoformat()),
+        load,
+        _seconds_until_midnight(),
+    )
+
+
+def invalidate_active_discounts():
+    """Сбрасывает кэш действующих скидок"""
+    cache.delete(ACTIVE_DISCOUNTS_KEY.format(date.today().isoformat()))
+
+
+def get_active_subjects_cached():
+    """Каталог активных предметов [(id, name)] (кэшируется на 5 минут)"""
+    from lessons.models import Subject
+
+    return cache.get_or_set(
+        ACTIVE_SUBJECTS_KEY,
+        lambda: list(Subject.objects.filter(is_active=True).values_list("id", "name")),
+        ACTIVE_SUBJECTS_TIMEOUT,
+    )
+
+
+def get_subject_catalog_cached():
+    """Активные предметы со всеми полями для страницы каталога (кэшируется на 5 минут)"""
+    from lessons.models import Subject
+
+    return cache.get_or_set(
+        SUBJECT_CATALOG_KEY,
+        lambda: list(Subject.objects.filter(is_active=True).order_by("name")),
+        ACTIVE_SUBJECTS_TIMEOUT,
+    )
+
+
+def invalidate_active_subjects():
+    """Сбрасывает кэш каталога предметов"""
+    cache.delete_many([ACTIVE_SUBJECTS_KEY, SUBJECT_CATALOG_KEY])
+
+
+def get_subject_price_cached(subject_id):
+    """Текущая цена за час предмета или None (кэшируется до конца дня)"""
+    from .models import PriceList
+
+    today = date.today()
+
+    def load():
+        return (
+            PriceList.objects.filter(
+                subject_id=subject_id, valid_from__lte=today, is_active=True
+            )
+            .order_by("-valid_from")
+            .values_list("price_per_hour", flat=True)
+            .first()
+        )
+
+    return cache.get_or_set(
+        SUBJECT_PRICE_KEY.format(subject_id, today.isoformat()),
+        load,
+        _seconds_until_midnight(),
+    )
+
+
+def invalidate_subject_price(subject_id):
+    """Сбрасывает кэш текущей цены предмета"""
+    cache.delete(SUBJECT_PRICE_KEY.format(subject_id, date.today().isoformat()))
@@ -55,7 +55,14 @@ class ContractChangeRequestForm(forms.ModelForm):
             )
 
         # Все активные предметы
-        self.fields["subject"].queryset = Subject.objects.filter(is_active=True)
+        self.fields["subject"].queryset = Subject.objects.filter(
+            is_active=True
+        ).summary()
+
+        # CSS-классы задаются один раз здесь, а не фильтром add_class в шаблоне
+        for name in ("contract", "request_type", "child", "subject"):
+            self.fields[name].widget.attrs["class"] = "form-select"
+        self.fields["description"].widget.attrs["class"] = "form-control"
 
         self.helper = FormHelper()
         self.helper.layout = Layout(
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:30
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_cached_monthly_amount(apps, schema_editor):
+    Contract = apps.get_model("contracts", "Contract")
+    ContractItem = apps.get_model("contracts", "ContractItem")
+    active_total = (
+        ContractItem.objects.filter(contract=models.OuterRef("pk"), is_active=True)
+        .values("contract")
+        .annotate(total=models.Sum("final_price"))
+        .values("total")
+    )
+    Contract.objects.update(
+        cached_monthly_amount=Coalesce(models.Subquery(active_total), Decimal("0.00"))
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contracts", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contract",
+            name="cached_monthly_amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=10,
+                verbose_name="Monatssumme",
+            ),
+        ),
+        migrations.RunPython(
+            backfill_cached_monthly_amount, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0003_contract_cached_monthly_amount'),
+    ]
+
+    # Промежуточные модели используют уже существующие M2M-таблицы,
+    # поэтому меняется только состояние миграций, без операций в БД.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='InvoiceOneTimeChargeLink',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contracts.invoice', verbose_name='Rechnung')),
+                        ('one_time_charge', models.ForeignKey(db_column='onetimecharge_id', on_delete=django.db.models.deletion.CASCADE, to='contracts.onetimecharge', verbose_name='Einmalige Gebuehr')),
+                    ],
+                    options={
+                        'verbose_name': 'Rechnungsgebuehr',
+                        'verbose_name_plural': 'Rechnungsgebuehren',
+                        'db_table': 'contracts_invoice_one_time_charges',
+                        'unique_together': {('invoice', 'one_time_charge')},
+                    },
+                ),
+                migrations.CreateModel(
+                    name='InvoiceContractItemLink',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('contract_item', models.ForeignKey(db_column='contractitem_id', on_delete=django.db.models.deletion.CASCADE, to='contracts.contractitem', verbose_name='Vertragsposition')),
+                        ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contracts.invoice', verbose_name='Rechnung')),
+                    ],
+                    options={
+                        'verbose_name': 'Rechnungsvertragsposition',
+                        'verbose_name_plural': 'Rechnungsvertragspositionen',
+                        'db_table': 'contracts_invoice_contract_items',
+                        'unique_together': {('invoice', 'contract_item')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='invoice',
+                    name='contract_items',
+                    field=models.ManyToManyField(blank=True, through='contracts.InvoiceContractItemLink', to='contracts.contractitem', verbose_name='Vertragspositionen'),
+                ),
+                migrations.AlterField(
+                    model_name='invoice',
+                    name='one_time_charges',
+                    field=models.ManyToManyField(blank=True, through='contracts.InvoiceOneTimeChargeLink', to='contracts.onetimecharge', verbose_name='Einmalige Gebuehren'),
+                ),
+            ],
+            database_operations=[],
+        ),
+    ]
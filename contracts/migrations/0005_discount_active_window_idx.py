@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:32
+
+import datetime
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contracts", "0004_invoice_through_models"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="discount",
+            index=models.Index(
+                models.F("is_active"),
+                models.F("valid_from"),
+                django.db.models.functions.comparison.Coalesce(
+                    "valid_to", models.Value(datetime.date(9999, 12, 31))
+                ),
+                name="discount_active_window_idx",
+            ),
+        ),
+    ]
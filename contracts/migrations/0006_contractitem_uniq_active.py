@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contracts", "0005_discount_active_window_idx"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="contractitem",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="contractitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("contract", "child", "subject"),
+                name="uniq_active_contractitem",
+            ),
+        ),
+    ]
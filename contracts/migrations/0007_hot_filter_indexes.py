@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contracts", "0006_contractitem_uniq_active"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contract",
+            index=models.Index(
+                fields=["parent", "-created_at"], name="contract_parent_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contractitem",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["child", "subject"],
+                name="idx_active_items",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(
+                fields=["parent", "status", "-issue_date"],
+                name="invoice_parent_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="onetimecharge",
+            index=models.Index(
+                fields=["parent", "-charge_date"], name="otc_parent_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contracts", "0007_hot_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Aktualisiert am"),
+        ),
+    ]
@@ -0,0 +1,15 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:50
+
+from django.contrib.postgres.operations import CreateExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contracts", "0008_invoice_updated_at"),
+    ]
+
+    # Статистика запросов для страницы query_stats (только PostgreSQL)
+    operations = [
+        CreateExtension("pg_stat_statements"),
+    ]
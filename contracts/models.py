@@ -1,9 +1,14 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 from datetime import date
+from calendar import monthrange
+
+from .cache import get_active_discounts_cached
 
 class PriceList(models.Model):
     """Модель таблицы цен с историей"""
@@ -81,9 +86,25 @@ class DiscountType(models.Model):
         return self.name
 
 
+# Конец срока действия скидки; бессрочные скидки действуют "до 9999 года"
+DISCOUNT_EFFECTIVE_END = Coalesce('valid_to', models.Value(date(9999, 12, 31)))
+
+
+class DiscountQuerySet(models.QuerySet):
+    """QuerySet скидок"""
+    
+    def active_on(self, day):
+        """Скидки, действующие в указанный день"""
+        return self.alias(effective_end=DISCOUNT_EFFECTIVE_END).filter(
+            is_active=True, valid_from__lte=day, effective_end__gte=day
+        )
+
+
 class Discount(models.Model):
     """Модель скидки"""
     
+    objects = DiscountQuerySet.as_manager()
+    
     discount_type = models.ForeignKey(
         DiscountType, 
         on_delete=models.CASCADE,
@@ -131,12 +152,57 @@ class Discount(models.Model):
         verbose_name = "Rabatt"
         verbose_name_plural = "Rabatte"
         ordering = ['-valid_from']
+        indexes = [
+            models.Index(
+                models.F('is_active'),
+                models.F('valid_from'),
+                DISCOUNT_EFFECTIVE_END,
+                name='discount_active_window_idx',
+            ),
+        ]
     
     def __str__(self):
         symbol = "%" if self.discount_type.is_percentage else "€"
         return f"{self.discount_type.name}: {self.value}{symbol}"
 
 
+class ContractQuerySet(models.QuerySet):
+    """QuerySet контрактов"""
+
+    def for_list(self):
+        """Только поля, необходимые для списков контрактов"""
+        return self.only(
+            "id",
+            "contract_number",
+            "parent_id",
+            "status",
+            "start_date",
+            "end_date",
+            "created_at",
+            "cached_monthly_amount",
+        )
+
+    def with_item_counts(self):
+        """Добавляет количество активных позиций (num_items)"""
+        return self.annotate(
+            num_items=models.Count("items", filter=models.Q(items__is_active=True))
+        )
+
+    def refresh_monthly_amounts(self):
+        """Пересчитывает кэшированную ежемесячную сумму одним UPDATE"""
+        active_total = (
+            ContractItem.objects.filter(contract=models.OuterRef("pk"), is_active=True)
+            .values("contract")
+            .annotate(total=models.Sum("final_price"))
+            .values("total")
+        )
+        return self.update(
+            cached_monthly_amount=Coalesce(
+                models.Subquery(active_total), Decimal("0.00")
+            )
+        )
+
+
 class Contract(models.Model):
     """Модель контракта"""
     
@@ -238,10 +304,24 @@ class Contract(models.Model):
         verbose_name="Notizen"
     )
     
+    # Денормализованная сумма активных позиций (обновляется сигналами)
+    cached_monthly_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name="Monatssumme"
+    )
+    
+    objects = ContractQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Vertrag"
         verbose_name_plural = "Vertraege"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['parent', '-created_at'], name='contract_parent_created_idx'),
+        ]
     
     def __str__(self):
         return f"Vertrag {self.contract_number} - {self.parent.get_full_name()}"
@@ -259,7 +339,7 @@ class Contract(models.Model):
     @property
     def total_monthly_amount(self):
         """Общая ежемесячная сумма по контракту"""
-        return sum(item.final_price for item in self.items.filter(is_active=True))
+        return self.cached_monthly_amount
     
     @property
     def is_sepa_client(self):
@@ -338,25 +418,36 @@ class ContractItem(models.Model):
     class Meta:
         verbose_name = "Vertragsposition"
         verbose_name_plural = "Vertragspositionen"
-        unique_together = ['contract', 'child', 'subject']
+        constraints = [
+            # Уникальна только активная позиция; неактивные остаются в истории
+            models.UniqueConstraint(
+                fields=['contract', 'child', 'subject'],
+                condition=models.Q(is_active=True),
+                name='uniq_active_contractitem',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['child', 'subject'],
+                condition=models.Q(is_active=True),
+                name='idx_active_items',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.child.user.get_full_name()} - {self.subject.name}"
     
     def calculate_discounts(self):
         """Расчет применимых скидок"""
-        total_discount = Decimal('0.00')
+        # Считаем в целых центах, в Decimal переводим только результат
+        base_cents = int(self.base_price * 100)
+        total_cents = 0
         
         # Получаем количество предметов в контракте
         subjects_count = self.contract.items.filter(is_active=True).count()
         
         # Применяем скидки
-        applicable_discounts = Discount.objects.filter(
-            is_active=True,
-            valid_from__lte=date.today()
-        ).filter(
-            models.Q(valid_to__isnull=True) | models.Q(valid_to__gte=date.today())
-        )
+        applicable_discounts = get_active_discounts_cached()
         
         for discount in applicable_discounts:
             # Проверяем условия применения скидки
@@ -365,15 +456,15 @@ class ContractItem(models.Model):
             if discount.max_subjects and subjects_count > discount.max_subjects:
                 continue
             
-            # Рассчитываем размер скидки
+            # Рассчитываем размер скидки (value в сотых долях процента / центах)
+            value_cents = int(discount.value * 100)
             if discount.discount_type.is_percentage:
-                discount_amount = self.base_price * discount.value / 100
+                # Округление до цента (половина - вверх)
+                total_cents += (base_cents * value_cents + 5000) // 10000
             else:
-                discount_amount = discount.value
-            
-            total_discount += discount_amount
+                total_cents += value_cents
         
-        return total_discount
+        return Decimal(total_cents).scaleb(-2)
     
     def update_final_price(self):
         """Обновляет итоговую цену с учетом скидок"""
@@ -654,12 +745,48 @@ class OneTimeCharge(models.Model):
         verbose_name = "Einmalige Gebuehr"
         verbose_name_plural = "Einmalige Gebuehren"
         ordering = ['-charge_date']
+        indexes = [
+            models.Index(fields=['parent', '-charge_date'], name='otc_parent_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_charge_type_display()}: {self.amount}€"
     
 
 
+class InvoiceQuerySet(models.QuerySet):
+    """QuerySet счетов"""
+
+    def for_list(self):
+        """Только поля, необходимые для списков счетов"""
+        return self.only(
+            "id",
+            "invoice_number",
+            "parent_id",
+            "period_start",
+            "period_end",
+            "total_discount",
+            "total_amount",
+            "status",
+            "issue_date",
+            "due_date",
+            "paid_date",
+            "invoice_file",
+        )
+
+    def with_totals(self):
+        """Добавляет сумму платежей подзапросом (без размножения строк)"""
+        paid_total = (
+            Payment.objects.filter(invoice=models.OuterRef("pk"))
+            .values("invoice")
+            .annotate(total=models.Sum("amount"))
+            .values("total")
+        )
+        return self.annotate(
+            paid_total=Coalesce(models.Subquery(paid_total), Decimal("0.00"))
+        )
+
+
 class Invoice(models.Model):
     """Модель счета на оплату"""
     
@@ -731,11 +858,13 @@ class Invoice(models.Model):
     # Связанные объекты
     contract_items = models.ManyToManyField(
         'ContractItem', 
+        through='InvoiceContractItemLink',
         blank=True,
         verbose_name="Vertragspositionen"
     )
     one_time_charges = models.ManyToManyField(
         'OneTimeCharge', 
+        through='InvoiceOneTimeChargeLink',
         blank=True,
         verbose_name="Einmalige Gebuehren"
     )
@@ -752,6 +881,10 @@ class Invoice(models.Model):
         auto_now_add=True,
         verbose_name="Erstellt am"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Aktualisiert am"
+    )
     created_by = models.ForeignKey(
         User, 
         on_delete=models.PROTECT,
@@ -762,10 +895,15 @@ class Invoice(models.Model):
         verbose_name="Notizen"
     )
     
+    objects = InvoiceQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Rechnung"
         verbose_name_plural = "Rechnungen"
         ordering = ['-issue_date']
+        indexes = [
+            models.Index(fields=['parent', 'status', '-issue_date'], name='invoice_parent_status_idx'),
+        ]
     
     def __str__(self):
         return f"Rechnung {self.invoice_number} - {self.parent.get_full_name()}"
@@ -807,6 +945,58 @@ class Invoice(models.Model):
         self.save(update_fields=['subtotal', 'total_discount', 'total_amount'])
 
 
+class InvoiceContractItemLink(models.Model):
+    """Связь счета с позициями контракта"""
+    
+    # Таблица и столбцы совпадают с автоматически созданной M2M-таблицей
+    invoice = models.ForeignKey(
+        Invoice,
+        on_delete=models.CASCADE,
+        verbose_name="Rechnung"
+    )
+    contract_item = models.ForeignKey(
+        ContractItem,
+        on_delete=models.CASCADE,
+        db_column='contractitem_id',
+        verbose_name="Vertragsposition"
+    )
+    
+    class Meta:
+        db_table = 'contracts_invoice_contract_items'
+        verbose_name = "Rechnungsvertragsposition"
+        verbose_name_plural = "Rechnungsvertragspositionen"
+        unique_together = ['invoice', 'contract_item']
+    
+    def __str__(self):
+        return f"{self.invoice_id} - {self.contract_item_id}"
+
+
+class InvoiceOneTimeChargeLink(models.Model):
+    """Связь счета с разовыми начислениями"""
+    
+    # Таблица и столбцы совпадают с автоматически созданной M2M-таблицей
+    invoice = models.ForeignKey(
+        Invoice,
+        on_delete=models.CASCADE,
+        verbose_name="Rechnung"
+    )
+    one_time_charge = models.ForeignKey(
+        OneTimeCharge,
+        on_delete=models.CASCADE,
+        db_column='onetimecharge_id',
+        verbose_name="Einmalige Gebuehr"
+    )
+    
+    class Meta:
+        db_table = 'contracts_invoice_one_time_charges'
+        verbose_name = "Rechnungsgebuehr"
+        verbose_name_plural = "Rechnungsgebuehren"
+        unique_together = ['invoice', 'one_time_charge']
+    
+    def __str__(self):
+        return f"{self.invoice_id} - {self.one_time_charge_id}"
+
+
 class InvoiceItem(models.Model):
     """Модель позиции счета (детализация)"""
     
@@ -889,6 +1079,30 @@ class InvoiceItem(models.Model):
         super().save(*args, **kwargs)
 
 
+class PaymentQuerySet(models.QuerySet):
+    """QuerySet платежей"""
+
+    def for_list(self):
+        """Платежи со счетом, только поля, нужные для списка платежей"""
+        return self.select_related("invoice").only(
+            "id",
+            "invoice_id",
+            "amount",
+            "payment_method",
+            "status",
+            "payment_date",
+            "reference_number",
+            "bank_details",
+            "created_at",
+            "notes",
+            "invoice__id",
+            "invoice__invoice_number",
+            "invoice__period_start",
+            "invoice__period_end",
+            "invoice__total_amount",
+        )
+
+
 class Payment(models.Model):
     """Модель платежа"""
     
@@ -959,6 +1173,8 @@ class Payment(models.Model):
         verbose_name="Notizen"
     )
     
+    objects = PaymentQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Zahlung"
         verbose_name_plural = "Zahlungen"
@@ -968,6 +1184,23 @@ class Payment(models.Model):
         return f"Zahlung {self.amount}€ - {self.invoice.invoice_number}"
 
 
+class DebtQuerySet(models.QuerySet):
+    """QuerySet задолженностей"""
+
+    def for_list(self):
+        """Только поля, необходимые для списков задолженностей"""
+        return self.only(
+            "id",
+            "parent_id",
+            "invoice_id",
+            "original_amount",
+            "remaining_amount",
+            "due_date",
+            "overdue_since",
+            "is_resolved",
+        )
+
+
 class Debt(models.Model):
     """Модель задолженности (автоматически генерируемые)"""
     
@@ -1039,6 +1272,8 @@ class Debt(models.Model):
         verbose_name="Aktualisiert am"
     )
     
+    objects = DebtQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Schuld"
         verbose_name_plural = "Schulden"
@@ -1117,6 +1352,52 @@ class PaymentPlan(models.Model):
     
     def __str__(self):
         return f"Ratenzahlung {self.monthly_payment}€/Monat - {self.debt.parent.get_full_name()}"
+    
+    @cached_property
+    def installment_totals(self):
+        """Суммы по ратам плана одним агрегатным запросом"""
+        totals = self.installments.aggregate(
+            scheduled=models.Sum('amount'),
+            paid=models.Sum('paid_amount'),
+        )
+        return {key: value or Decimal('0.00') for key, value in totals.items()}
+    
+    @property
+    def total_scheduled(self):
+        """Общая сумма запланированных рат"""
+        return self.installment_totals['scheduled']
+    
+    @property
+    def total_paid(self):
+        """Общая оплаченная сумма по ратам"""
+        return self.installment_totals['paid']
+    
+    def create_installments(self):
+        """Создает график рат одним bulk INSERT"""
+        if self.monthly_payment <= 0:
+            raise ValidationError("Die monatliche Rate muss groesser als 0 sein.")
+        
+        installments = []
+        remaining = self.total_amount
+        while remaining > 0:
+            amount = min(self.monthly_payment, remaining)
+            installments.append(PaymentPlanInstallment(
+                payment_plan=self,
+                installment_number=len(installments) + 1,
+                due_date=_add_months(self.start_date, len(installments)),
+                amount=amount,
+            ))
+            remaining -= amount
+        
+        self.__dict__.pop('installment_totals', None)
+        return PaymentPlanInstallment.objects.bulk_create(installments)
+
+
+def _add_months(day, months):
+    """Дата через указанное число месяцев (день ограничен концом месяца)"""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, monthrange(year, month)[1]))
 
 
 class PaymentPlanInstallment(models.Model):
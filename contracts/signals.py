@@ -0,0 +1,74 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from lessons.models import Subject
+
+from .cache import (
+    invalidate_active_discounts,
+    invalidate_active_subjects,
+    invalidate_subject_price,
+)
+from .models import (
+    Contract,
+    ContractItem,
+    Discount,
+    DiscountType,
+    Invoice,
+    Payment,
+    PriceList,
+)
+
+
+@receiver(pre_save, sender=ContractItem)
+def remember_previous_contract(sender, instance, **kwargs):
+    """Запоминает прежний контракт позиции перед сохранением"""
+    instance._previous_contract_id = (
+        ContractItem.objects.filter(pk=instance.pk)
+        .values_list("contract_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=ContractItem)
+@receiver(post_delete, sender=ContractItem)
+def update_cached_monthly_amount(sender, instance, **kwargs):
+    """Обновляет кэшированную ежемесячную сумму контракта позиции"""
+    # При переносе позиции в другой контракт пересчитывается и прежний контракт
+    contract_ids = {
+        instance.contract_id,
+        getattr(instance, "_previous_contract_id", None),
+    }
+    contract_ids.discard(None)
+    Contract.objects.filter(pk__in=contract_ids).refresh_monthly_amounts()
+
+
+@receiver(post_save, sender=Discount)
+@receiver(post_delete, sender=Discount)
+@receiver(post_save, sender=DiscountType)
+def reset_active_discounts(sender, **kwargs):
+    """Сбрасывает кэш действующих скидок при их изменении"""
+    invalidate_active_discounts()
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def touch_invoice(sender, instance, **kwargs):
+    """Отмечает счет платежа как измененный"""
+    Invoice.objects.filter(pk=instance.invoice_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def reset_active_subjects(sender, **kwargs):
+    """Сбрасывает кэш каталога предметов при его изменении"""
+    invalidate_active_subjects()
+
+
+@receiver(post_save, sender=PriceList)
+@receiver(post_delete, sender=PriceList)
+def reset_subject_price(sender, instance, **kwargs):
+    """Сбрасывает кэш текущей цены предмета при изменении прайс-листа"""
+    invalidate_subject_price(instance.subject_id)
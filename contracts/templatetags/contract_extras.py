@@ -1,6 +1,7 @@
 from decimal import Decimal
 
 from django import template
+from django.db.models import Sum
 
 register = template.Library()
 
@@ -18,11 +19,9 @@ def add_class(field, css_class):
 @register.filter
 def sum_amounts(queryset):
     """Суммирует поле amount в QuerySet"""
-    total = Decimal("0.00")
-    for item in queryset:
-        if hasattr(item, "amount"):
-            total += item.amount
-    return total
+    if hasattr(queryset, "aggregate"):
+        return queryset.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+    return sum((getattr(item, "amount", 0) for item in queryset), Decimal("0.00"))
 
 
 @register.filter
@@ -48,18 +47,10 @@ def calculate_hourly_rate(base_price, hours_per_month):
 @register.filter
 def total_payments(payments):
     """Вычисляет общую сумму платежей"""
-    total = Decimal("0.00")
-    for payment in payments:
-        if hasattr(payment, "amount"):
-            total += payment.amount
-    return total
+    return sum_amounts(payments)
 
 
 @register.filter
 def sum_group_amounts(group_list):
     """Суммирует amount для группы объектов"""
-    total = Decimal("0.00")
-    for item in group_list:
-        if hasattr(item, "amount"):
-            total += item.amount
-    return total
+    return sum((getattr(item, "amount", 0) for item in group_list), Decimal("0.00"))
@@ -1,3 +1,321 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from clients.models import Child, UserProfile
+from lessons.models import Subject
+
+from .models import (
+    Contract,
+    ContractChangeRequest,
+    ContractItem,
+    Debt,
+    Invoice,
+    InvoiceItem,
+    OneTimeCharge,
+    Payment,
+    PaymentPlan,
+)
+
+
+class QueryCountTests(TestCase):
+    """Число SQL-запросов в списках не должно зависеть от количества строк"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            username="admin", first_name="Ad", last_name="Min"
+        )
+        UserProfile.objects.create(user=cls.admin, role="admin")
+        cls.parent = User.objects.create(
+            username="parent", first_name="Pa", last_name="Rent"
+        )
+        UserProfile.objects.create(user=cls.parent, role="parent")
+
+        cls.subjects = [
+            Subject.objects.create(name=f"Fach {i}", code=f"F{i}") for i in range(5)
+        ]
+        cls.contract = Contract.objects.create(
+            contract_number="V-1",
+            parent=cls.parent,
+            contract_type="monthly",
+            payment_type="sepa",
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=365),
+            cancellation_deadline=date.today(),
+            status="active",
+            created_by=cls.admin,
+        )
+        cls.child_number = 0
+        cls.add_rows(10)
+
+    @classmethod
+    def add_rows(cls, count):
+        """Добавляет детей, позиции, счета, платежи, начисления и заявки"""
+        for _ in range(count):
+            cls.child_number += 1
+            number = cls.child_number
+            user = User.objects.create(
+                username=f"child{number}", first_name=f"Kind{number}", last_name="X"
+            )
+            UserProfile.objects.create(user=user, role="child")
+            child = Child.objects.create(
+                user=user, parent=cls.parent, birth_date=date(2015, 1, 1)
+            )
+            subject = cls.subjects[number % len(cls.subjects)]
+            ContractItem.objects.create(
+                contract=cls.contract,
+                child=child,
+                subject=subject,
+                base_price=Decimal("50.00"),
+                price_date=date.today(),
+                final_price=Decimal("45.00"),
+            )
+
+            invoice = Invoice.objects.create(
+                invoice_number=f"R-{number}",
+                parent=cls.parent,
+                period_start=date.today(),
+                period_end=date.today(),
+                subtotal=Decimal("100.00"),
+                total_amount=Decimal("100.00"),
+                issue_date=date.today(),
+                due_date=date.today(),
+                status="sent",
+                created_by=cls.admin,
+            )
+            for _ in range(5):
+                InvoiceItem.objects.create(
+                    invoice=invoice,
+                    item_type="regular",
+                    description="Unterricht",
+                    child=child,
+                    subject=subject,
+                    quantity=Decimal("1.00"),
+                    unit_price=Decimal("20.00"),
+                    total_amount=Decimal("20.00"),
+                    payer="client",
+                )
+            Payment.objects.create(
+                invoice=invoice,
+                amount=Decimal("20.00"),
+                payment_method="sepa",
+                payment_date=date.today(),
+                created_by=cls.admin,
+            )
+
+            OneTimeCharge.objects.create(
+                parent=cls.parent,
+                child=child,
+                charge_type="materials",
+                description="Material",
+                amount=Decimal("5.00"),
+                charge_date=date.today(),
+                due_date=date.today(),
+                created_by=cls.admin,
+            )
+            ContractChangeRequest.objects.create(
+                parent=cls.parent,
+                contract=cls.contract,
+                child=child,
+                subject=subject,
+                request_type="add_subject",
+                description="Bitte hinzufügen",
+            )
+
+    def setUp(self):
+        self.client.force_login(self.parent)
+
+    def assertConstantQueries(self, expected, url):
+        """Проверяет число запросов до и после удвоения количества строк"""
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.add_rows(10)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_contracts_list(self):
+        self.assertConstantQueries(5, reverse("contracts:contracts_list"))
+
+    def test_contract_detail(self):
+        self.assertConstantQueries(
+            10, reverse("contracts:contract_detail", args=[self.contract.id])
+        )
+
+    def test_requests_list(self):
+        self.assertConstantQueries(5, reverse("contracts:requests_list"))
+
+    def test_invoices_list(self):
+        self.assertConstantQueries(7, reverse("contracts:invoices_list"))
+
+    def test_payments_list(self):
+        self.assertConstantQueries(7, reverse("contracts:payments_list"))
+
+    def test_one_time_charges(self):
+        self.assertConstantQueries(7, reverse("contracts:one_time_charges"))
+
+
+class PriceEstimateTests(TestCase):
+    """Проверка параметров AJAX-расчета стоимости"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create(username="parent")
+        UserProfile.objects.create(user=cls.parent, role="parent")
+
+    def setUp(self):
+        self.client.force_login(self.parent)
+
+    def test_invalid_subject_id_returns_400(self):
+        url = reverse("contracts:calculate_price_estimate")
+        for value in ["abc", "²", "1.5"]:
+            response = self.client.get(
+                url, {"request_type": "add_subject", "subject_id": value}
+            )
+            self.assertEqual(response.status_code, 400, value)
+
+
+class CachedMonthlyAmountTests(TestCase):
+    """Кэшированная ежемесячная сумма контракта следует за позициями"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create(username="parent")
+        UserProfile.objects.create(user=cls.parent, role="parent")
+        cls.child = Child.objects.create(
+            user=User.objects.create(username="child"),
+            parent=cls.parent,
+            birth_date=date(2015, 1, 1),
+        )
+        cls.subjects = [
+            Subject.objects.create(name=f"Fach {i}", code=f"F{i}") for i in range(2)
+        ]
+        cls.contract = cls.create_contract("V-1")
+        cls.other_contract = cls.create_contract("V-2")
+
+    @classmethod
+    def create_contract(cls, number):
+        return Contract.objects.create(
+            contract_number=number,
+            parent=cls.parent,
+            contract_type="monthly",
+            payment_type="sepa",
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=365),
+            cancellation_deadline=date.today(),
+            created_by=cls.parent,
+        )
+
+    def add_item(self, subject, price, contract=None):
+        return ContractItem.objects.create(
+            contract=contract or self.contract,
+            child=self.child,
+            subject=subject,
+            base_price=Decimal(price),
+            price_date=date.today(),
+            final_price=Decimal(price),
+        )
+
+    def assertCachedAmount(self, contract, expected):
+        contract.refresh_from_db()
+        self.assertEqual(contract.cached_monthly_amount, Decimal(expected))
+
+    def test_amount_follows_item_changes(self):
+        first = self.add_item(self.subjects[0], "40.00")
+        self.add_item(self.subjects[1], "25.50")
+        self.assertCachedAmount(self.contract, "65.50")
+
+        first.final_price = Decimal("30.00")
+        first.save()
+        self.assertCachedAmount(self.contract, "55.50")
+
+        first.is_active = False
+        first.save()
+        self.assertCachedAmount(self.contract, "25.50")
+
+        first.delete()
+        self.assertCachedAmount(self.contract, "25.50")
+
+    def test_moving_item_refreshes_both_contracts(self):
+        item = self.add_item(self.subjects[0], "40.00")
+        self.add_item(self.subjects[1], "10.00", contract=self.other_contract)
+
+        item.contract = self.other_contract
+        item.save()
+
+        self.assertCachedAmount(self.contract, "0.00")
+        self.assertCachedAmount(self.other_contract, "50.00")
+
+    def test_refresh_monthly_amounts_after_bulk_update(self):
+        item = self.add_item(self.subjects[0], "40.00")
+        # update() не отправляет сигналы, пересчет вызывается явно
+        ContractItem.objects.filter(pk=item.pk).update(final_price=Decimal("12.00"))
+        self.assertCachedAmount(self.contract, "40.00")
+
+        Contract.objects.filter(pk=self.contract.pk).refresh_monthly_amounts()
+        self.assertCachedAmount(self.contract, "12.00")
+
+
+class PaymentPlanInstallmentTests(TestCase):
+    """График рат плана погашения"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create(username="parent")
+        invoice = Invoice.objects.create(
+            invoice_number="R-1",
+            parent=cls.parent,
+            period_start=date(2024, 1, 1),
+            period_end=date(2024, 1, 31),
+            subtotal=Decimal("250.00"),
+            total_amount=Decimal("250.00"),
+            issue_date=date(2024, 1, 1),
+            due_date=date(2024, 1, 15),
+            created_by=cls.parent,
+        )
+        cls.debt = Debt.objects.create(
+            parent=cls.parent,
+            invoice=invoice,
+            original_amount=Decimal("250.00"),
+            remaining_amount=Decimal("250.00"),
+            due_date=date(2024, 1, 15),
+            period_start=date(2024, 1, 1),
+            period_end=date(2024, 1, 31),
+        )
+
+    def create_plan(self, monthly_payment):
+        return PaymentPlan.objects.create(
+            debt=self.debt,
+            total_amount=Decimal("250.00"),
+            monthly_payment=Decimal(monthly_payment),
+            start_date=date(2024, 1, 31),
+            end_date=date(2024, 3, 31),
+            created_by=self.parent,
+        )
+
+    def test_installments_split_total_and_clamp_month_end(self):
+        plan = self.create_plan("100.00")
+        plan.create_installments()
+
+        installments = plan.installments.order_by("installment_number")
+        self.assertEqual(
+            [(i.installment_number, i.due_date, i.amount) for i in installments],
+            [
+                (1, date(2024, 1, 31), Decimal("100.00")),
+                (2, date(2024, 2, 29), Decimal("100.00")),
+                (3, date(2024, 3, 31), Decimal("50.00")),
+            ],
+        )
 
-# Create your tests here.
+    def test_non_positive_monthly_payment_is_rejected(self):
+        plan = self.create_plan("0.00")
+        with self.assertRaises(ValidationError):
+            plan.create_installments()
+        self.assertFalse(plan.installments.exists())
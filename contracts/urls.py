@@ -34,4 +34,6 @@ urlpatterns = [
     path("payments/", views.payments_list_view, name="payments_list"),
     # Разовые начисления
     path("charges/", views.one_time_charges_view, name="one_time_charges"),
+    # Мониторинг
+    path("admin/query-stats/", views.query_stats_view, name="query_stats"),
 ]
@@ -1,14 +1,21 @@
+from datetime import date
+from decimal import Decimal
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.core.paginator import Paginator
-from django.db.models import Q, Sum
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Max, Q, Sum
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
 
+from clients.decorators import parent_required
 from clients.models import Child
-from lessons.models import Subject
-from notifications.models import notify_new_contract_request
+from educational_center.pagination import paginate
+from notifications.cache import get_notification_counts_cached
+from notifications.tasks import notify_new_contract_request_task
 
+from .cache import get_active_subjects_cached, get_subject_price_cached
 from .forms import ContractChangeRequestForm, OneTimeChargeForm
 from .models import (
     Contract,
@@ -19,13 +26,13 @@ from .models import (
 )
 
 
-@login_required
+# Размер страницы для списков родителя
+LIST_PAGE_SIZE = 25
+
+
+@parent_required
 def create_contract_request(request):
     """Создание заявки на изменение контракта"""
-    if not request.user.userprofile.is_parent:
-        messages.error(request, "Zugriff verweigert.")
-        return redirect("login")
-
     if request.method == "POST":
         form = ContractChangeRequestForm(request.POST, parent=request.user)
         if form.is_valid():
@@ -36,8 +43,10 @@ def create_contract_request(request):
             request_obj.calculate_estimated_change()
             request_obj.save()
 
-            # Уведомляем администраторов
-            notify_new_contract_request(request_obj)
+            # Уведомляем администраторов в фоне после фиксации транзакции
+            transaction.on_commit(
+                lambda: notify_new_contract_request_task.delay(request_obj.id)
+            )
 
             messages.success(request, "Ihr Antrag wurde erfolgreich eingereicht.")
             return redirect("clients:parent_dashboard")
@@ -69,68 +78,76 @@ def contract_request_detail(request, request_id):
     return render(request, "contracts/request_detail.html", context)
 
 
-@login_required
+@parent_required(ajax=True)
 def calculate_price_estimate(request):
     """AJAX endpoint для расчета предполагаемой стоимости"""
-    if not request.user.userprofile.is_parent:
-        return JsonResponse({"error": "Zugriff verweigert"}, status=403)
-
     request_type = request.GET.get("request_type")
     subject_id = request.GET.get("subject_id")
     child_id = request.GET.get("child_id")
 
+    # Некорректные идентификаторы отклоняем до обращения к БД
     try:
-        if request_type == "add_subject" and subject_id:
-            from lessons.models import Subject
-
-            subject = Subject.objects.get(id=subject_id)
-            current_price = subject.current_price
-
-            if current_price:
-                # Упрощенный расчет - здесь можно добавить логику скидок
-                estimated_change = float(current_price)
-                return JsonResponse(
-                    {
-                        "estimated_change": estimated_change,
-                        "formatted_change": f"+{estimated_change:.2f}€",
-                    }
-                )
-
-        elif request_type == "remove_subject" and subject_id and child_id:
-            from clients.models import Child
-
-            child = Child.objects.get(id=child_id, parent=request.user)
-
-            # Найти существующую позицию контракта
-            contract_item = ContractItem.objects.filter(
-                child=child, subject_id=subject_id, is_active=True
-            ).first()
-
-            if contract_item:
-                estimated_change = -float(contract_item.final_price)
-                return JsonResponse(
-                    {
-                        "estimated_change": estimated_change,
-                        "formatted_change": f"{estimated_change:.2f}€",
-                    }
-                )
+        subject_id = int(subject_id) if subject_id else None
+        child_id = int(child_id) if child_id else None
+    except ValueError:
+        return JsonResponse({"error": "Ungültige Parameter"}, status=400)
+
+    if request_type == "add_subject" and subject_id:
+        # Та же цена, что и Subject.current_price, без загрузки предмета
+        current_price = get_subject_price_cached(subject_id)
+
+        if current_price:
+            # Упрощенный расчет - здесь можно добавить логику скидок
+            estimated_change = float(current_price)
+            return JsonResponse(
+                {
+                    "estimated_change": estimated_change,
+                    "formatted_change": f"+{estimated_change:.2f}€",
+                }
+            )
+
+    elif request_type == "remove_subject" and subject_id and child_id:
+        child_id = (
+            Child.objects.filter(id=child_id, parent=request.user)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if child_id is None:
+            return JsonResponse({"error": "Kind nicht gefunden"}, status=404)
+
+        # Цена существующей позиции контракта
+        price = (
+            ContractItem.objects.filter(
+                child_id=child_id, subject_id=subject_id, is_active=True
+            )
+            .values_list("final_price", flat=True)
+            .first()
+        )
 
-        return JsonResponse({"estimated_change": 0, "formatted_change": "0.00€"})
+        if price is not None:
+            estimated_change = -float(price)
+            return JsonResponse(
+                {
+                    "estimated_change": estimated_change,
+                    "formatted_change": f"{estimated_change:.2f}€",
+                }
+            )
 
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({"estimated_change": 0, "formatted_change": "0.00€"})
 
 
-@login_required
+@parent_required
 def contracts_list_view(request):
     """Список контрактов для родителей"""
-    if not request.user.userprofile.is_parent:
-        messages.error(request, "Zugriff verweigert.")
-        return redirect("login")
-
-    contracts = Contract.objects.filter(parent=request.user).order_by("-created_at")
+    contracts = (
+        Contract.objects.filter(parent=request.user)
+        .for_list()
+        .with_item_counts()
+        .order_by("-created_at")
+    )
+    page_obj = paginate(request, contracts, LIST_PAGE_SIZE)
 
-    context = {"contracts": contracts, "title": "Meine Verträge"}
+    context = {"contracts": page_obj, "page_obj": page_obj, "title": "Meine Verträge"}
 
     return render(request, "contracts/contracts_list.html", context)
 
@@ -154,7 +171,9 @@ def contract_detail_view(request, contract_id):
     )
 
     # Получаем связанные заявки
-    change_requests = contract.change_requests.order_by("-created_at")[:10]
+    change_requests = contract.change_requests.select_related(
+        "parent", "child__user", "subject"
+    ).order_by("-created_at")[:10]
 
     context = {
         "contract": contract,
@@ -184,72 +203,105 @@ def contract_items_view(request, contract_id):
     return render(request, "contracts/contract_items.html", context)
 
 
-@login_required
+@parent_required
 def contract_requests_list_view(request):
     """Список заявок на изменение контрактов"""
-    if not request.user.userprofile.is_parent:
-        messages.error(request, "Zugriff verweigert.")
-        return redirect("login")
-
-    requests = ContractChangeRequest.objects.filter(parent=request.user).order_by(
-        "-created_at"
+    requests = (
+        ContractChangeRequest.objects.filter(parent=request.user)
+        .select_related("child__user", "subject", "contract")
+        .order_by("-created_at")
     )
 
-    context = {"requests": requests, "title": "Meine Anträge"}
+    page_obj = paginate(request, requests, LIST_PAGE_SIZE)
+
+    context = {"requests": page_obj, "page_obj": page_obj, "title": "Meine Anträge"}
 
     return render(request, "contracts/requests_list.html", context)
 
 
-@login_required
+@parent_required(ajax=True)
 def get_child_subjects(request):
     """AJAX endpoint для получения предметов ребенка"""
-    if not request.user.userprofile.is_parent:
-        return JsonResponse({"error": "Zugriff verweigert"}, status=403)
+    child_id = (
+        Child.objects.filter(id=request.GET.get("child_id"), parent=request.user)
+        .values_list("id", flat=True)
+        .first()
+    )
+    if child_id is None:
+        return JsonResponse({"error": "Kind nicht gefunden"}, status=404)
 
-    child_id = request.GET.get("child_id")
+    # Активные предметы ребенка; каталог для добавления берется из кэша
+    current_subjects = list(
+        ContractItem.objects.filter(child_id=child_id, is_active=True)
+        .values_list("subject_id", "subject__name")
+        .order_by("subject__name")
+        .distinct()
+    )
+    current_ids = {subject_id for subject_id, _ in current_subjects}
+    available_subjects = [
+        subject
+        for subject in get_active_subjects_cached()
+        if subject[0] not in current_ids
+    ]
+
+    return JsonResponse(
+        {
+            "current_subjects": current_subjects,
+            "available_subjects": available_subjects,
+        }
+    )
 
-    try:
-        child = Child.objects.get(id=child_id, parent=request.user)
-
-        # Получаем активные предметы ребенка
-        current_subjects = ContractItem.objects.filter(
-            child=child, is_active=True
-        ).values_list("subject_id", "subject__name")
-
-        # Получаем доступные предметы для добавления
-        available_subjects = (
-            Subject.objects.filter(is_active=True)
-            .exclude(id__in=[s[0] for s in current_subjects])
-            .values_list("id", "name")
-        )
 
-        return JsonResponse(
-            {
-                "current_subjects": list(current_subjects),
-                "available_subjects": list(available_subjects),
-            }
-        )
+def _invoices_list_etag(request):
+    """ETag списка счетов: меняется при изменении счетов или уведомлений"""
+    # Ожидающие flash-сообщения должны быть показаны, ответ 304 их скрыл бы
+    if not request.user.is_authenticated or len(messages.get_messages(request)):
+        return None
 
-    except Child.DoesNotExist:
-        return JsonResponse({"error": "Kind nicht gefunden"}, status=404)
+    invoices = Invoice.objects.filter(parent=request.user).aggregate(
+        count=Count("id"), last_modified=Max("updated_at")
+    )
+    # Счетчики в навигации (notifications_context) тоже входят в страницу;
+    # они запоминаются в запросе, чтобы контекст-процессор их не перечитывал
+    notifications = get_notification_counts_cached(request.user.id)
+    request._notification_counts = notifications
+    return "{}-{}-{}-{}-{}-{}-{}".format(
+        request.user.pk,
+        request.GET.get("status", ""),
+        request.GET.get("page", ""),
+        invoices["count"],
+        invoices["last_modified"] and invoices["last_modified"].timestamp(),
+        notifications["unread"],
+        notifications["critical"],
+    )
 
 
-@login_required
+@parent_required
+@condition(etag_func=_invoices_list_etag)
 def invoices_list_view(request):
     """Список счетов для родителей"""
-    if not request.user.userprofile.is_parent:
-        messages.error(request, "Zugriff verweigert.")
-        return redirect("login")
-
-    invoices = Invoice.objects.filter(parent=request.user).order_by("-issue_date")
+    invoices = Invoice.objects.filter(parent=request.user)
 
     # Фильтрация по статусу
     status_filter = request.GET.get("status")
     if status_filter:
         invoices = invoices.filter(status=status_filter)
 
+    summary = invoices.aggregate(
+        count=Count("id"),
+        paid=Count("id", filter=Q(status="paid")),
+        overdue=Count("id", filter=Q(status="overdue")),
+    )
+    page_obj = paginate(
+        request,
+        invoices.for_list().with_totals().order_by("-issue_date"),
+        LIST_PAGE_SIZE,
+    )
+
     context = {
-        "invoices": invoices,
+        "invoices": page_obj,
+        "page_obj": page_obj,
+        "summary": summary,
         "status_filter": status_filter,
         "invoice_statuses": Invoice.INVOICE_STATUS,
         "title": "Meine Rechnungen",
@@ -276,46 +328,124 @@ def invoice_detail_view(request, invoice_id):
 
     # Получаем платежи
     payments = invoice.payments.order_by("-payment_date")
+    payments_total = payments.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
 
     context = {
         "invoice": invoice,
         "invoice_items": invoice_items,
         "payments": payments,
+        "payments_total": payments_total,
+        "remaining_amount": invoice.total_amount - payments_total,
         "title": f"Rechnung {invoice.invoice_number}",
     }
 
     return render(request, "contracts/invoice_detail.html", context)
 
 
-@login_required
+@parent_required
 def payments_list_view(request):
     """История платежей для родителей"""
-    if not request.user.userprofile.is_parent:
-        messages.error(request, "Zugriff verweigert.")
-        return redirect("login")
-
     from .models import Payment
 
-    payments = (
-        Payment.objects.filter(invoice__parent=request.user)
-        .select_related("invoice")
-        .order_by("-payment_date")
+    payments = Payment.objects.filter(invoice__parent=request.user)
+
+    month_start = date.today().replace(day=1)
+    summary = payments.aggregate(
+        count=Count("id"),
+        total=Sum("amount"),
+        this_month=Count("id", filter=Q(payment_date__gte=month_start)),
+    )
+    top_method = (
+        payments.values_list("payment_method", flat=True)
+        .annotate(n=Count("id"))
+        .order_by("-n")
+        .first()
     )
+    summary["top_method"] = dict(Payment.PAYMENT_METHODS).get(top_method)
 
-    context = {"payments": payments, "title": "Meine Zahlungen"}
+    page_obj = paginate(
+        request, payments.for_list().order_by("-payment_date"), LIST_PAGE_SIZE
+    )
+
+    context = {
+        "payments": page_obj,
+        "page_obj": page_obj,
+        "summary": summary,
+        "payments_total": summary["total"] or Decimal("0.00"),
+        "title": "Meine Zahlungen",
+    }
 
     return render(request, "contracts/payments_list.html", context)
 
 
-@login_required
+@parent_required
 def one_time_charges_view(request):
     """Разовые начисления для родителей"""
-    if not request.user.userprofile.is_parent:
-        messages.error(request, "Zugriff verweigert.")
-        return redirect("login")
+    charges = OneTimeCharge.objects.filter(parent=request.user)
 
-    charges = OneTimeCharge.objects.filter(parent=request.user).order_by("-charge_date")
+    summary = charges.aggregate(
+        count=Count("id"),
+        paid=Count("id", filter=Q(is_paid=True)),
+        pending=Count("id", filter=Q(is_paid=False)),
+        total=Sum("amount"),
+    )
+    charge_labels = dict(OneTimeCharge.CHARGE_TYPES)
+    charge_categories = [
+        {**row, "label": charge_labels.get(row["charge_type"], row["charge_type"])}
+        for row in charges.values("charge_type")
+        .annotate(count=Count("id"), total=Sum("amount"))
+        .order_by("charge_type")
+    ]
+
+    page_obj = paginate(
+        request,
+        charges.select_related("child__user").order_by("-charge_date"),
+        LIST_PAGE_SIZE,
+    )
 
-    context = {"charges": charges, "title": "Einmalige Gebühren"}
+    context = {
+        "charges": page_obj,
+        "page_obj": page_obj,
+        "summary": summary,
+        "charge_categories": charge_categories,
+        "charges_total": summary["total"] or Decimal("0.00"),
+        "title": "Einmalige Gebühren",
+    }
 
     return render(request, "contracts/one_time_charges.html", context)
+
+
+def is_superuser(user):
+    """Проверка, является ли пользователь суперпользователем"""
+    return user.is_superuser
+
+
+@login_required
+@user_passes_test(is_superuser)
+def query_stats_view(request):
+    """Топ-10 SQL-запросов по суммарному времени (pg_stat_statements)"""
+    statements = []
+    error = None
+
+    if connection.vendor != "postgresql":
+        error = "Die Abfragestatistik ist nur mit PostgreSQL verfügbar."
+    else:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT query, calls, total_exec_time, mean_exec_time, rows "
+                    "FROM pg_stat_statements "
+                    "ORDER BY total_exec_time DESC LIMIT 10"
+                )
+                columns = [column[0] for column in cursor.description]
+                statements = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except DatabaseError:
+            error = "pg_stat_statements ist auf dem Datenbankserver nicht aktiviert."
+
+    context = {
+        "statements": statements,
+        "error": error,
+        "title": "Abfragestatistik",
+    }
+
+    return render(request, "contracts/query_stats.html", context)
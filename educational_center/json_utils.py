@@ -0,0 +1,17 @@
+from django.http import HttpResponse, JsonResponse
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен - используем стандартный json
+    orjson = None
+
+
+def json_response(data, status=200):
+    """Возвращает JSON-ответ, сериализуя данные через orjson при его наличии"""
+    if orjson is None:
+        return JsonResponse(data, status=status)
+    return HttpResponse(
+        orjson.dumps(data, option=orjson.OPT_NAIVE_UTC),
+        status=status,
+        content_type="application/json",
+    )
@@ -0,0 +1,10 @@
+from django.core.paginator import Paginator
+
+
+def paginate(request, queryset, per_page):
+    """Страница выборки; прочие GET-параметры для ссылок хранятся в page_obj.query"""
+    page_obj = Paginator(queryset, per_page).get_page(request.GET.get("page"))
+    params = request.GET.copy()
+    params.pop("page", None)
+    page_obj.query = params.urlencode()
+    return page_obj
@@ -70,9 +70,17 @@ DATABASES = {
         "PASSWORD": "postgres",
         "HOST": "db",
         "PORT": "5432",
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+AUTHENTICATION_BACKENDS = [
+    "clients.backends.ProfileModelBackend",
+    # Для сессий, созданных до появления ProfileModelBackend
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -113,9 +121,18 @@ LOGIN_URL = "/login/"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/login/"
 
+# Кэш (Redis)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("CACHE_URL", default="redis://redis:6379/1"),
+    }
+}
+
 # Celery Configuration (для фоновых задач и уведомлений)
 CELERY_BROKER_URL = config("REDIS_URL", default="redis://redis:6379/0")
 CELERY_RESULT_BACKEND = config("REDIS_URL", default="redis://redis:6379/0")
+CELERY_TASK_ALWAYS_EAGER = config("CELERY_TASK_ALWAYS_EAGER", default=False, cast=bool)
 
 # Настройки для отправки email (потом настроим)
 EMAIL_BACKEND = (
@@ -1,14 +1,78 @@
+from datetime import date
+
 from django.contrib import admin
+from django.db import transaction
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Now
+
+from clients.models import Child
+from contracts.models import ContractItem, PriceList
+from notifications.models import notify_absence
+
 from .models import (
     Subject, Group, Schedule, GroupEnrollment, ActualLesson, 
     AttendanceRecord, AbsenceHistory, TrialLesson
 )
 
 
+# Шаблоны цветных ячеек списков для format_html
+ENROLLMENT_FULL_HTML = '<span style="color: red; font-weight: bold;">{}/{}</span>'
+ENROLLMENT_ALMOST_FULL_HTML = '<span style="color: orange;">{}/{}</span>'
+ENROLLMENT_FREE_HTML = '<span style="color: green;">{}/{}</span>'
+ATTENDANCE_HTML = '<span style="color: {};">{}/{} ({}%)</span>'
+
+
+def light_choice_queryset(field_name):
+    """Возвращает облегченный queryset для выпадающего списка внешнего ключа"""
+    # Загружаются только поля, нужные для __str__ связанной модели
+    if field_name == 'child':
+        return Child.objects.select_related('user').only(
+            'id', 'birth_date', 'user__first_name', 'user__last_name'
+        )
+    if field_name == 'group':
+        return Group.objects.select_related('subject').only(
+            'id', 'name', 'subject__name'
+        )
+    if field_name == 'lesson':
+        return ActualLesson.objects.select_related('group').only(
+            'id', 'scheduled_date', 'group__name'
+        )
+    if field_name == 'contract_item':
+        return ContractItem.objects.select_related('child__user', 'subject').only(
+            'id', 'child__user__first_name', 'child__user__last_name', 'subject__name'
+        )
+    return None
+
+
+class LightForeignKeyMixin:
+    """Миксин с облегченными выпадающими списками внешних ключей"""
+    
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Подставляет облегченный queryset для известных полей"""
+        if 'queryset' not in kwargs:
+            queryset = light_choice_queryset(db_field.name)
+            if queryset is not None:
+                kwargs['queryset'] = queryset
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class ChangelistDeferMixin:
+    """Миксин, откладывающий загрузку длинных текстовых полей в списке"""
+    
+    changelist_defer = ()
+    
+    def get_queryset(self, request):
+        """Откладывает поля только для списка, а не для формы изменения"""
+        qs = super().get_queryset(request)
+        match = request.resolver_match
+        if self.changelist_defer and match and match.url_name.endswith('_changelist'):
+            qs = qs.defer(*self.changelist_defer)
+        return qs
+
+
 class ScheduleInline(admin.TabularInline):
     """Инлайн для расписания группы"""
     model = Schedule
@@ -22,6 +86,7 @@ class GroupEnrollmentInline(admin.TabularInline):
     extra = 0
     fields = ('child', 'status', 'enrollment_date', 'end_date')
     readonly_fields = ('enrollment_date',)
+    raw_id_fields = ('child',)
 
 
 class AttendanceRecordInline(admin.TabularInline):
@@ -30,6 +95,13 @@ class AttendanceRecordInline(admin.TabularInline):
     extra = 0
     fields = ('child', 'status', 'arrival_time', 'departure_time', 'notes')
     readonly_fields = ('marked_by',)
+    raw_id_fields = ('child',)
+    show_change_link = True
+    
+    def get_queryset(self, request):
+        """Оптимизация запросов"""
+        qs = super().get_queryset(request)
+        return qs.select_related('child__user', 'marked_by')
 
 
 @admin.register(Subject)
@@ -39,6 +111,7 @@ class SubjectAdmin(admin.ModelAdmin):
                    'get_current_price', 'get_active_groups', 'is_active')
     list_filter = ('is_active', 'default_duration', 'created_at')
     search_fields = ('name', 'code', 'description')
+    ordering = ('name',)
     readonly_fields = ('created_at', 'updated_at', 'current_price')
     
     fieldsets = (
@@ -54,6 +127,19 @@ class SubjectAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Оптимизация запросов"""
+        # Текущая цена берется подзапросом вместо запроса на каждую строку
+        current_price = PriceList.objects.filter(
+            subject=OuterRef('pk'), valid_from__lte=date.today(), is_active=True
+        ).order_by('-valid_from').values('price_per_hour')[:1]
+        
+        qs = super().get_queryset(request)
+        return qs.annotate(
+            active_groups_count=Count('group', filter=Q(group__is_active=True)),
+            current_price_value=Subquery(current_price),
+        )
+    
     def get_age_range(self, obj):
         """Получает возрастной диапазон"""
         if obj.min_age and obj.max_age:
@@ -67,20 +153,22 @@ class SubjectAdmin(admin.ModelAdmin):
     
     def get_current_price(self, obj):
         """Получает текущую цену"""
-        price = obj.current_price
+        price = obj.current_price_value
         if price:
             return f"{price}€/Std."
         return "Nicht festgelegt"
     get_current_price.short_description = 'Aktueller Preis'
+    get_current_price.admin_order_field = 'current_price_value'
     
     def get_active_groups(self, obj):
         """Получает количество активных групп"""
-        count = obj.group_set.filter(is_active=True).count()
+        count = obj.active_groups_count
         if count > 0:
             url = reverse('admin:lessons_group_changelist') + f'?subject__id__exact={obj.id}'
             return format_html('<a href="{}">{} Gruppen</a>', url, count)
         return "0 Gruppen"
     get_active_groups.short_description = 'Aktive Gruppen'
+    get_active_groups.admin_order_field = 'active_groups_count'
 
 
 @admin.register(Group)
@@ -90,6 +178,7 @@ class GroupAdmin(admin.ModelAdmin):
                    'get_enrollment_info', 'level', 'is_active')
     list_filter = ('group_type', 'is_active', 'subject', 'level')
     search_fields = ('name', 'subject__name', 'level')
+    ordering = ('subject__name', 'name')
     filter_horizontal = ('teachers',)
     readonly_fields = ('created_at', 'updated_at', 'current_enrollment_count', 'available_spots')
     inlines = [ScheduleInline, GroupEnrollmentInline]
@@ -114,35 +203,43 @@ class GroupAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Оптимизация запросов"""
+        qs = super().get_queryset(request)
+        return qs.select_related('subject').prefetch_related('teachers')
+    
     def get_teachers_list(self, obj):
         """Получает список учителей"""
-        teachers = obj.teachers.all()[:3]  # Показываем только первых 3
+        teachers = list(obj.teachers.all())  # Берется из prefetch_related
         if teachers:
             teacher_links = []
-            for teacher in teachers:
+            for teacher in teachers[:3]:  # Показываем только первых 3
                 url = reverse('admin:auth_user_change', args=[teacher.id])
                 teacher_links.append(f'<a href="{url}">{teacher.get_full_name()}</a>')
             
             result = ', '.join(teacher_links)
-            if obj.teachers.count() > 3:
-                result += f' (+{obj.teachers.count() - 3} weitere)'
+            total = len(teachers)
+            if total > 3:
+                result += f' (+{total - 3} weitere)'
             return mark_safe(result)
         return "Keine Lehrer"
     get_teachers_list.short_description = 'Lehrer'
     
     def get_enrollment_info(self, obj):
         """Получает информацию о зачислениях"""
-        current = obj.current_enrollment_count
+        current = obj.active_enrollment_count
         max_students = obj.max_students
         
         # Цветовое кодирование заполненности
         if current >= max_students:
-            return format_html('<span style="color: red; font-weight: bold;">{}/{}</span>', current, max_students)
+            template = ENROLLMENT_FULL_HTML
         elif current >= max_students * 0.8:
-            return format_html('<span style="color: orange;">{}/{}</span>', current, max_students)
+            template = ENROLLMENT_ALMOST_FULL_HTML
         else:
-            return format_html('<span style="color: green;">{}/{}</span>', current, max_students)
+            template = ENROLLMENT_FREE_HTML
+        return format_html(template, current, max_students)
     get_enrollment_info.short_description = 'Belegung'
+    get_enrollment_info.admin_order_field = 'active_enrollment_count'
 
 
 @admin.register(Schedule)
@@ -150,6 +247,7 @@ class ScheduleAdmin(admin.ModelAdmin):
     """Админка для расписания"""
     list_display = ('group', 'get_weekday_time', 'duration', 'classroom', 
                    'valid_from', 'valid_to', 'is_active')
+    list_select_related = ('group__subject',)
     list_filter = ('weekday', 'is_active', 'valid_from', 'group__subject')
     search_fields = ('group__name', 'classroom')
     readonly_fields = ('end_time',)
@@ -174,43 +272,60 @@ class ScheduleAdmin(admin.ModelAdmin):
 
 
 @admin.register(GroupEnrollment)
-class GroupEnrollmentAdmin(admin.ModelAdmin):
+class GroupEnrollmentAdmin(LightForeignKeyMixin, admin.ModelAdmin):
     """Админка для зачислений в группы"""
     list_display = ('child', 'group', 'status', 'enrollment_date', 'end_date')
+    list_select_related = ('child__user', 'group__subject')
     list_filter = ('status', 'enrollment_date', 'group__subject')
     search_fields = ('child__user__first_name', 'child__user__last_name', 'group__name')
     readonly_fields = ('enrollment_date',)
+    autocomplete_fields = ('child', 'group', 'contract_item')
     
     actions = ['activate_enrollments', 'suspend_enrollments', 'complete_enrollments']
     
+    def _update_enrollments(self, queryset, **fields):
+        """Обновляет зачисления и пересчитывает счетчики их групп (update() не вызывает сигналы)"""
+        group_ids = set(queryset.values_list('group_id', flat=True))
+        updated = queryset.update(**fields)
+        Group.objects.filter(pk__in=group_ids).refresh_enrollment_counts()
+        return updated
+    
+    @transaction.atomic
     def activate_enrollments(self, request, queryset):
         """Активирует зачисления"""
-        updated = queryset.update(status='active')
+        updated = self._update_enrollments(queryset, status='active')
         self.message_user(request, f'{updated} Anmeldungen wurden aktiviert.')
     activate_enrollments.short_description = 'Anmeldungen aktivieren'
     
+    @transaction.atomic
     def suspend_enrollments(self, request, queryset):
         """Приостанавливает зачисления"""
-        updated = queryset.update(status='suspended')
+        updated = self._update_enrollments(queryset, status='suspended')
         self.message_user(request, f'{updated} Anmeldungen wurden ausgesetzt.')
     suspend_enrollments.short_description = 'Anmeldungen aussetzen'
     
+    @transaction.atomic
     def complete_enrollments(self, request, queryset):
         """Завершает зачисления"""
-        from datetime import date
-        updated = queryset.update(status='completed', end_date=date.today())
+        updated = self._update_enrollments(
+            queryset, status='completed', end_date=date.today()
+        )
         self.message_user(request, f'{updated} Anmeldungen wurden abgeschlossen.')
     complete_enrollments.short_description = 'Anmeldungen abschliessen'
 
 
 @admin.register(ActualLesson)
-class ActualLessonAdmin(admin.ModelAdmin):
+class ActualLessonAdmin(ChangelistDeferMixin, LightForeignKeyMixin, admin.ModelAdmin):
     """Админка для фактических занятий"""
     list_display = ('group', 'scheduled_date', 'actual_teacher', 'status', 
-                   'duration', 'get_attendance_count', 'is_substitution')
-    list_filter = ('status', 'scheduled_date', 'group__subject')
+                   'duration', 'get_attendance_count', 'was_substituted')
+    list_select_related = ('group__subject', 'scheduled_teacher', 'actual_teacher')
+    changelist_defer = ('lesson_content', 'homework_assigned', 'notes')
+    list_filter = ('status', 'was_substituted', 'scheduled_date', 'group__subject')
     search_fields = ('group__name', 'scheduled_teacher__first_name', 'actual_teacher__first_name')
-    readonly_fields = ('created_at', 'updated_at', 'is_substitution')
+    ordering = ('-scheduled_date',)
+    readonly_fields = ('created_at', 'updated_at', 'was_substituted')
+    autocomplete_fields = ('group', 'scheduled_teacher', 'actual_teacher')
     inlines = [AttendanceRecordInline]
     
     fieldsets = (
@@ -225,15 +340,25 @@ class ActualLessonAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Системная информация', {
-            'fields': ('is_substitution', 'created_at', 'updated_at', 'updated_by'),
+            'fields': ('was_substituted', 'created_at', 'updated_at', 'updated_by'),
             'classes': ('collapse',)
         }),
     )
     
+    def get_queryset(self, request):
+        """Оптимизация запросов"""
+        qs = super().get_queryset(request)
+        return qs.annotate(
+            present_count=Count(
+                'attendance_records', filter=Q(attendance_records__status='present')
+            ),
+            attendance_total=Count('attendance_records'),
+        )
+    
     def get_attendance_count(self, obj):
         """Получает количество присутствующих"""
-        present = obj.attendance_records.filter(status='present').count()
-        total = obj.attendance_records.count()
+        present = obj.present_count
+        total = obj.attendance_total
         if total > 0:
             percentage = (present / total) * 100
             if percentage >= 90:
@@ -242,8 +367,7 @@ class ActualLessonAdmin(admin.ModelAdmin):
                 color = 'orange'
             else:
                 color = 'red'
-            return format_html('<span style="color: {};">{}/{} ({}%)</span>', 
-                             color, present, total, int(percentage))
+            return format_html(ATTENDANCE_HTML, color, present, total, int(percentage))
         return "Keine Daten"
     get_attendance_count.short_description = 'Anwesenheit'
     
@@ -254,12 +378,14 @@ class ActualLessonAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_conducted', 'mark_as_cancelled']
     
+    @transaction.atomic
     def mark_as_conducted(self, request, queryset):
         """Отмечает как проведенные"""
         updated = queryset.update(status='conducted')
         self.message_user(request, f'{updated} Unterrichtsstunden wurden als durchgefuehrt markiert.')
     mark_as_conducted.short_description = 'Als durchgefuehrt markieren'
     
+    @transaction.atomic
     def mark_as_cancelled(self, request, queryset):
         """Отмечает как отмененные"""
         updated = queryset.update(status='cancelled')
@@ -268,12 +394,14 @@ class ActualLessonAdmin(admin.ModelAdmin):
 
 
 @admin.register(AttendanceRecord)
-class AttendanceRecordAdmin(admin.ModelAdmin):
+class AttendanceRecordAdmin(LightForeignKeyMixin, admin.ModelAdmin):
     """Админка для записей посещаемости"""
     list_display = ('lesson', 'child', 'status', 'arrival_time', 'departure_time', 'marked_by')
+    list_select_related = ('lesson__group', 'child__user', 'marked_by')
     list_filter = ('status', 'lesson__scheduled_date', 'lesson__group__subject')
     search_fields = ('child__user__first_name', 'child__user__last_name', 'lesson__group__name')
     readonly_fields = ('created_at', 'marked_by')
+    autocomplete_fields = ('lesson', 'child')
     
     def save_model(self, request, obj, form, change):
         """Автоматически устанавливает отметившего пользователя"""
@@ -283,10 +411,12 @@ class AttendanceRecordAdmin(admin.ModelAdmin):
 
 
 @admin.register(AbsenceHistory)
-class AbsenceHistoryAdmin(admin.ModelAdmin):
+class AbsenceHistoryAdmin(ChangelistDeferMixin, admin.ModelAdmin):
     """Админка для истории пропусков"""
     list_display = ('child', 'subject', 'lesson_date', 'absence_type', 
                    'excuse_provided', 'parent_notified')
+    list_select_related = ('child__user', 'subject')
+    changelist_defer = ('excuse_reason',)
     list_filter = ('absence_type', 'excuse_provided', 'parent_notified', 'lesson_date')
     search_fields = ('child__user__first_name', 'child__user__last_name', 'subject__name')
     readonly_fields = ('created_at', 'notification_sent_at')
@@ -318,28 +448,30 @@ class AbsenceHistoryAdmin(admin.ModelAdmin):
     
     def notify_parents(self, request, queryset):
         """Уведомляет родителей"""
-        from notifications.models import notify_absence
-        from datetime import datetime
-        
-        updated = 0
-        for absence in queryset.filter(parent_notified=False):
+        pending = list(
+            queryset.filter(parent_notified=False)
+            .select_related('child__user', 'child__parent', 'subject')
+        )
+        for absence in pending:
             notify_absence(absence)
-            absence.parent_notified = True
-            absence.notification_sent_at = datetime.now()
-            absence.save()
-            updated += 1
         
-        self.message_user(request, f'{updated} Eltern wurden benachrichtigt.')
+        AbsenceHistory.objects.filter(pk__in=[a.pk for a in pending]).update(
+            parent_notified=True, notification_sent_at=Now()
+        )
+        self.message_user(request, f'{len(pending)} Eltern wurden benachrichtigt.')
     notify_parents.short_description = 'Eltern benachrichtigen'
 
 
 @admin.register(TrialLesson)
-class TrialLessonAdmin(admin.ModelAdmin):
+class TrialLessonAdmin(ChangelistDeferMixin, admin.ModelAdmin):
     """Админка для пробных занятий"""
     list_display = ('child', 'subject', 'teacher', 'scheduled_date', 'status', 'enrolled_after_trial')
+    list_select_related = ('child__user', 'subject', 'teacher')
+    changelist_defer = ('teacher_feedback', 'notes')
     list_filter = ('status', 'enrolled_after_trial', 'scheduled_date', 'subject')
     search_fields = ('child__user__first_name', 'child__user__last_name', 'subject__name')
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('child', 'subject', 'teacher', 'recommended_group')
     
     fieldsets = (
         ('Основная информация', {
@@ -41,6 +41,12 @@ class ActualLessonForm(forms.ModelForm):
         )
 
 
+# Общие виджеты полей посещаемости; Field копирует виджет сам
+_STATUS_WIDGET = forms.Select(attrs={"class": "form-control"})
+_TIME_WIDGET = forms.TimeInput(attrs={"type": "time", "class": "form-control"})
+_NOTES_WIDGET = forms.TextInput(attrs={"class": "form-control"})
+
+
 class LessonAttendanceForm(forms.Form):
     """Форма для отметки посещаемости занятия"""
 
@@ -60,12 +66,16 @@ class LessonAttendanceForm(forms.Form):
         self.lesson = kwargs.pop("lesson", None)
         super().__init__(*args, **kwargs)
 
+        # Зачисленные студенты загружаются один раз вместе с пользователями
+        enrolled_students = []
         if self.lesson:
-            # Добавляем поля для каждого зачисленного студента
-            enrolled_students = self.lesson.group.groupenrollment_set.filter(
-                status="active"
+            enrolled_students = list(
+                self.lesson.group.groupenrollment_set.filter(
+                    status="active"
+                ).select_related("child__user")
             )
 
+            # Добавляем поля для каждого зачисленного студента
             for enrollment in enrolled_students:
                 child = enrollment.child
 
@@ -74,32 +84,28 @@ class LessonAttendanceForm(forms.Form):
                     label=f"{child.user.get_full_name()}",
                     choices=AttendanceRecord.ATTENDANCE_STATUS,
                     initial="present",
-                    widget=forms.Select(attrs={"class": "form-control"}),
+                    widget=_STATUS_WIDGET,
                 )
 
                 # Поле времени прихода
                 self.fields[f"arrival_time_{child.id}"] = forms.TimeField(
                     label="Ankunftszeit",
                     required=False,
-                    widget=forms.TimeInput(
-                        attrs={"type": "time", "class": "form-control"}
-                    ),
+                    widget=_TIME_WIDGET,
                 )
 
                 # Поле времени ухода
                 self.fields[f"departure_time_{child.id}"] = forms.TimeField(
                     label="Abgangszeit",
                     required=False,
-                    widget=forms.TimeInput(
-                        attrs={"type": "time", "class": "form-control"}
-                    ),
+                    widget=_TIME_WIDGET,
                 )
 
                 # Поле заметок о студенте
                 self.fields[f"notes_{child.id}"] = forms.CharField(
                     label="Notizen",
                     required=False,
-                    widget=forms.TextInput(attrs={"class": "form-control"}),
+                    widget=_NOTES_WIDGET,
                 )
 
         self.helper = FormHelper()
@@ -117,28 +123,23 @@ class LessonAttendanceForm(forms.Form):
             HTML("<tbody>"),
         )
 
-        if self.lesson:
-            enrolled_students = self.lesson.group.groupenrollment_set.filter(
-                status="active"
-            )
-            for enrollment in enrolled_students:
-                child = enrollment.child
-                self.helper.layout.append(
-                    HTML(
-                        f"""
+        # Все строки таблицы собираются в один HTML-узел
+        rows_html = "\n".join(
+            f"""
                     <tr>
-                        <td><strong>{child.user.get_full_name()}</strong></td>
-                        <td>{{% field 'attendance_{child.id}' %}}</td>
-                        <td>{{% field 'arrival_time_{child.id}' %}}</td>
-                        <td>{{% field 'departure_time_{child.id}' %}}</td>
-                        <td>{{% field 'notes_{child.id}' %}}</td>
+                        <td><strong>{enrollment.child.user.get_full_name()}</strong></td>
+                        <td>{{% field 'attendance_{enrollment.child.id}' %}}</td>
+                        <td>{{% field 'arrival_time_{enrollment.child.id}' %}}</td>
+                        <td>{{% field 'departure_time_{enrollment.child.id}' %}}</td>
+                        <td>{{% field 'notes_{enrollment.child.id}' %}}</td>
                     </tr>
                     """
-                    )
-                )
+            for enrollment in enrolled_students
+        )
 
         self.helper.layout.extend(
             [
+                HTML(rows_html),
                 HTML("</tbody></table></div>"),
                 Submit(
                     "submit",
@@ -149,6 +150,11 @@ class LessonAttendanceForm(forms.Form):
         )
 
 
+def active_subjects_choices():
+    """Активные предметы с полями, нужными для выпадающего списка"""
+    return Subject.objects.filter(is_active=True).only("id", "name", "code")
+
+
 class TrialLessonBookingForm(forms.ModelForm):
     """Форма для записи на пробное занятие"""
 
@@ -171,11 +177,14 @@ class TrialLessonBookingForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         if self.parent:
-            self.fields["child"].queryset = Child.objects.filter(
-                parent=self.parent, is_active=True
+            # Для подписи варианта нужны только имя и дата рождения
+            self.fields["child"].queryset = (
+                Child.objects.filter(parent=self.parent, is_active=True)
+                .select_related("user")
+                .only("id", "birth_date", "user__first_name", "user__last_name")
             )
 
-        self.fields["subject"].queryset = Subject.objects.filter(is_active=True)
+        self.fields["subject"].queryset = active_subjects_choices()
 
         self.helper = FormHelper()
         self.helper.layout = Layout(
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lessons", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="absencehistory",
+            index=models.Index(fields=["-lesson_date"], name="absence_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="actuallesson",
+            index=models.Index(fields=["-scheduled_date"], name="lesson_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="actuallesson",
+            index=models.Index(
+                fields=["status", "-scheduled_date"], name="lesson_status_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="groupenrollment",
+            index=models.Index(
+                fields=["group", "status"], name="enrollment_group_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="triallesson",
+            index=models.Index(
+                fields=["status", "-scheduled_date"], name="trial_status_date_idx"
+            ),
+        ),
+    ]
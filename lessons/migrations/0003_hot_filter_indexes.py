@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lessons", "0002_admin_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="absencehistory",
+            index=models.Index(
+                fields=["child", "-lesson_date"], name="absence_child_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="actuallesson",
+            index=models.Index(
+                fields=["group", "-scheduled_date"], name="lesson_group_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="actuallesson",
+            index=models.Index(
+                fields=["scheduled_teacher", "-scheduled_date"],
+                name="lesson_teacher_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="actuallesson",
+            index=models.Index(
+                fields=["actual_teacher", "-scheduled_date"],
+                name="lesson_actual_teacher_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["weekday", "start_time"],
+                name="schedule_active_slot_idx",
+            ),
+        ),
+    ]
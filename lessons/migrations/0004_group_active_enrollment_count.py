@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:57
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_active_enrollment_count(apps, schema_editor):
+    Group = apps.get_model("lessons", "Group")
+    GroupEnrollment = apps.get_model("lessons", "GroupEnrollment")
+    active_count = (
+        GroupEnrollment.objects.filter(group=models.OuterRef("pk"), status="active")
+        .values("group")
+        .annotate(total=models.Count("pk"))
+        .values("total")
+    )
+    Group.objects.update(
+        active_enrollment_count=Coalesce(models.Subquery(active_count), 0)
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lessons", "0003_hot_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="group",
+            name="active_enrollment_count",
+            field=models.PositiveIntegerField(
+                db_index=True,
+                default=0,
+                editable=False,
+                verbose_name="Aktive Einschreibungen",
+            ),
+        ),
+        migrations.RunPython(
+            backfill_active_enrollment_count, migrations.RunPython.noop
+        ),
+    ]
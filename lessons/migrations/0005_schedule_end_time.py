@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-15 23:10
+
+import datetime
+
+from django.db import migrations, models
+
+
+def backfill_end_time(apps, schema_editor):
+    Schedule = apps.get_model("lessons", "Schedule")
+    # Одно UPDATE на каждую пару (начало, длительность) вместо сохранения строк
+    slots = Schedule.objects.values_list("start_time", "duration").distinct()
+    for start_time, duration in slots:
+        hours, minutes = divmod(start_time.hour * 60 + start_time.minute + duration, 60)
+        Schedule.objects.filter(start_time=start_time, duration=duration).update(
+            end_time=datetime.time(hours % 24, minutes, start_time.second)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lessons", "0004_group_active_enrollment_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="schedule",
+            name="end_time",
+            field=models.TimeField(
+                default=datetime.time(0, 0), editable=False, verbose_name="Endzeit"
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_end_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(
+                fields=["weekday", "start_time", "end_time"],
+                name="schedule_slot_end_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-15 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lessons", "0005_schedule_end_time"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="attendancerecord",
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name="groupenrollment",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="attendancerecord",
+            constraint=models.UniqueConstraint(
+                fields=("lesson", "child"),
+                include=("status",),
+                name="uniq_attendance_lesson_child",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="groupenrollment",
+            constraint=models.UniqueConstraint(
+                fields=("child", "group", "contract_item"),
+                include=("status", "enrollment_date"),
+                name="uniq_enrollment",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-15 23:02
+
+from django.db import migrations, models
+
+
+def backfill_was_substituted(apps, schema_editor):
+    ActualLesson = apps.get_model("lessons", "ActualLesson")
+    ActualLesson.objects.filter(actual_teacher__isnull=False).exclude(
+        actual_teacher=models.F("scheduled_teacher")
+    ).update(was_substituted=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lessons", "0006_covering_unique_constraints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="actuallesson",
+            name="was_substituted",
+            field=models.BooleanField(
+                db_index=True, default=False, editable=False, verbose_name="Vertretung"
+            ),
+        ),
+        migrations.RunPython(backfill_was_substituted, migrations.RunPython.noop),
+    ]
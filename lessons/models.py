@@ -1,10 +1,21 @@
-from datetime import datetime, timedelta
+from datetime import time
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 
+from contracts.cache import get_subject_price_cached
+
+
+class SubjectQuerySet(models.QuerySet):
+    """QuerySet предметов"""
+
+    def summary(self):
+        """Загружает предметы без длинных текстовых полей"""
+        return self.defer("description", "required_materials")
+
 
 class Subject(models.Model):
     """Модель предмета"""
@@ -31,6 +42,8 @@ class Subject(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Erstellt am")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Aktualisiert am")
 
+    objects = SubjectQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Fach"
         verbose_name_plural = "Faecher"
@@ -52,19 +65,34 @@ class Subject(models.Model):
     @property
     def current_price(self):
         """Возвращает текущую цену предмета"""
-        from datetime import date
+        return get_subject_price_cached(self.pk)
 
-        from contracts.models import PriceList
 
-        current_price = (
-            PriceList.objects.filter(
-                subject=self, valid_from__lte=date.today(), is_active=True
-            )
-            .order_by("-valid_from")
-            .first()
-        )
+def teachers_prefetch(lookup="teachers"):
+    """Prefetch учителей только с полями, которые выводятся в шаблонах"""
+    return models.Prefetch(
+        lookup, queryset=User.objects.only("id", "first_name", "last_name", "email")
+    )
+
 
-        return current_price.price_per_hour if current_price else None
+class GroupQuerySet(models.QuerySet):
+    """QuerySet учебных групп"""
+
+    def with_relations(self):
+        """Подгружает предмет и учителей, выводимые в списке и карточке группы"""
+        return self.select_related("subject").prefetch_related(teachers_prefetch())
+
+    def refresh_enrollment_counts(self):
+        """Пересчитывает кэшированное количество активных зачислений одним UPDATE"""
+        active_count = (
+            GroupEnrollment.objects.filter(group=models.OuterRef("pk"), status="active")
+            .values("group")
+            .annotate(total=models.Count("pk"))
+            .values("total")
+        )
+        return self.update(
+            active_enrollment_count=Coalesce(models.Subquery(active_count), 0)
+        )
 
 
 class Group(models.Model):
@@ -93,6 +121,10 @@ class Group(models.Model):
     max_students = models.IntegerField(
         default=12, verbose_name="Maximale Teilnehmerzahl"
     )  # Для индивидуальных = 1
+    # Поддерживается сигналами GroupEnrollment, чтобы не считать зачисления в списках
+    active_enrollment_count = models.PositiveIntegerField(
+        default=0, editable=False, db_index=True, verbose_name="Aktive Einschreibungen"
+    )
 
     is_active = models.BooleanField(default=True, verbose_name="Aktiv")
     notes = models.TextField(blank=True, verbose_name="Notizen")
@@ -100,6 +132,8 @@ class Group(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Erstellt am")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Aktualisiert am")
 
+    objects = GroupQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Gruppe"
         verbose_name_plural = "Gruppen"
@@ -119,7 +153,7 @@ class Group(models.Model):
     @property
     def current_enrollment_count(self):
         """Текущее количество зачисленных студентов"""
-        return self.groupenrollment_set.filter(status="active").count()
+        return self.active_enrollment_count
 
     @property
     def available_spots(self):
@@ -129,7 +163,7 @@ class Group(models.Model):
     @property
     def is_full(self):
         """Проверяет, заполнена ли группа"""
-        return self.available_spots <= 0
+        return self.active_enrollment_count >= self.max_students
 
 
 class Schedule(models.Model):
@@ -144,6 +178,7 @@ class Schedule(models.Model):
         (5, "Samstag"),
         (6, "Sonntag"),
     ]
+    _WEEKDAY_MAP = dict(WEEKDAYS)
 
     group = models.ForeignKey(
         Group, on_delete=models.CASCADE, related_name="schedules", verbose_name="Gruppe"
@@ -153,6 +188,8 @@ class Schedule(models.Model):
     duration = models.IntegerField(
         verbose_name="Dauer (Minuten)"
     )  # продолжительность в минутах
+    # Хранится в БД для фильтрации по времени окончания, вычисляется в save()
+    end_time = models.TimeField(editable=False, verbose_name="Endzeit")
 
     # Период действия расписания
     valid_from = models.DateField(verbose_name="Gueltig ab")
@@ -167,16 +204,31 @@ class Schedule(models.Model):
         verbose_name = "Stundenplan"
         verbose_name_plural = "Stundenplaene"
         ordering = ["weekday", "start_time"]
+        indexes = [
+            models.Index(
+                fields=["weekday", "start_time"],
+                condition=models.Q(is_active=True),
+                name="schedule_active_slot_idx",
+            ),
+            models.Index(
+                fields=["weekday", "start_time", "end_time"],
+                name="schedule_slot_end_idx",
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.group.name} - {self.get_weekday_display()} {self.start_time}"
+        return f"{self.group.name} - {self._WEEKDAY_MAP.get(self.weekday, self.weekday)} {self.start_time}"
 
-    @property
-    def end_time(self):
+    def save(self, *args, **kwargs):
+        self.end_time = self.compute_end_time(self.start_time, self.duration)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def compute_end_time(start_time, duration):
         """Вычисляет время окончания занятия"""
-        start_datetime = datetime.combine(datetime.today(), self.start_time)
-        end_datetime = start_datetime + timedelta(minutes=self.duration)
-        return end_datetime.time()
+        # Целочисленная арифметика в минутах вместо datetime/timedelta
+        hours, minutes = divmod(start_time.hour * 60 + start_time.minute + duration, 60)
+        return time(hours % 24, minutes, start_time.second)
 
 
 class GroupEnrollment(models.Model):
@@ -210,12 +262,41 @@ class GroupEnrollment(models.Model):
     class Meta:
         verbose_name = "Gruppenanmeldung"
         verbose_name_plural = "Gruppenanmeldungen"
-        unique_together = ["child", "group", "contract_item"]
+        constraints = [
+            # Покрывающий индекс: статус и дата читаются без обращения к таблице
+            models.UniqueConstraint(
+                fields=["child", "group", "contract_item"],
+                include=["status", "enrollment_date"],
+                name="uniq_enrollment",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["group", "status"], name="enrollment_group_status_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.child.user.get_full_name()} in {self.group.name}"
 
 
+class ActualLessonQuerySet(models.QuerySet):
+    """QuerySet фактических занятий"""
+
+    def list_fields(self):
+        """Загружает только поля, нужные в списках занятий"""
+        return self.only(
+            "id",
+            "group_id",
+            "scheduled_teacher_id",
+            "actual_teacher_id",
+            "scheduled_date",
+            "actual_date",
+            "duration",
+            "status",
+        )
+
+
 class ActualLesson(models.Model):
     """Модель фактического проведения занятий"""
 
@@ -225,6 +306,7 @@ class ActualLesson(models.Model):
         ("cancelled", "Abgesagt"),
         ("rescheduled", "Verschoben"),
     ]
+    _STATUS_MAP = dict(LESSON_STATUS)
 
     group = models.ForeignKey(Group, on_delete=models.CASCADE, verbose_name="Gruppe")
     scheduled_teacher = models.ForeignKey(
@@ -252,6 +334,10 @@ class ActualLesson(models.Model):
     status = models.CharField(
         max_length=15, choices=LESSON_STATUS, default="scheduled", verbose_name="Status"
     )
+    # Вычисляется в save(), чтобы фильтровать замещения в SQL
+    was_substituted = models.BooleanField(
+        default=False, editable=False, db_index=True, verbose_name="Vertretung"
+    )
 
     # Примечания о занятии
     lesson_content = models.TextField(blank=True, verbose_name="Unterrichtsinhalt")
@@ -268,18 +354,49 @@ class ActualLesson(models.Model):
         verbose_name="Aktualisiert von",
     )
 
+    objects = ActualLessonQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Tatsaechlicher Unterricht"
         verbose_name_plural = "Tatsaechlicher Unterricht"
         ordering = ["-scheduled_date"]
+        indexes = [
+            models.Index(fields=["-scheduled_date"], name="lesson_date_idx"),
+            models.Index(
+                fields=["status", "-scheduled_date"], name="lesson_status_date_idx"
+            ),
+            models.Index(
+                fields=["group", "-scheduled_date"], name="lesson_group_date_idx"
+            ),
+            models.Index(
+                fields=["scheduled_teacher", "-scheduled_date"],
+                name="lesson_teacher_date_idx",
+            ),
+            models.Index(
+                fields=["actual_teacher", "-scheduled_date"],
+                name="lesson_actual_teacher_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.group.name} - {self.scheduled_date.strftime('%d.%m.%Y %H:%M')}"
 
+    @property
+    def display_status(self):
+        """Название статуса занятия без обращения к _meta"""
+        return self._STATUS_MAP.get(self.status, self.status)
+
+    def save(self, *args, **kwargs):
+        self.was_substituted = bool(
+            self.actual_teacher_id
+            and self.actual_teacher_id != self.scheduled_teacher_id
+        )
+        super().save(*args, **kwargs)
+
     @property
     def is_substitution(self):
         """Проверяет, было ли замещение учителя"""
-        return self.actual_teacher and self.actual_teacher != self.scheduled_teacher
+        return self.was_substituted
 
 
 class AttendanceRecord(models.Model):
@@ -291,6 +408,7 @@ class AttendanceRecord(models.Model):
         ("late", "Verspaetet"),
         ("excused", "Entschuldigt"),
     ]
+    _STATUS_MAP = dict(ATTENDANCE_STATUS)
 
     lesson = models.ForeignKey(
         ActualLesson,
@@ -316,10 +434,21 @@ class AttendanceRecord(models.Model):
     class Meta:
         verbose_name = "Anwesenheitsrekord"
         verbose_name_plural = "Anwesenheitsrekorde"
-        unique_together = ["lesson", "child"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["lesson", "child"],
+                include=["status"],
+                name="uniq_attendance_lesson_child",
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.child.user.get_full_name()} - {self.get_status_display()}"
+        return f"{self.child.user.get_full_name()} - {self.display_status}"
+
+    @property
+    def display_status(self):
+        """Название статуса посещаемости"""
+        return self._STATUS_MAP.get(self.status, self.status)
 
 
 class AbsenceHistory(models.Model):
@@ -358,6 +487,12 @@ class AbsenceHistory(models.Model):
         verbose_name = "Fehlzeitenhistorie"
         verbose_name_plural = "Fehlzeitenhistorien"
         ordering = ["-lesson_date"]
+        indexes = [
+            models.Index(fields=["-lesson_date"], name="absence_date_idx"),
+            models.Index(
+                fields=["child", "-lesson_date"], name="absence_child_date_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.child.user.get_full_name()} - {self.subject.name} ({self.lesson_date.strftime('%d.%m.%Y')})"
@@ -422,6 +557,11 @@ class TrialLesson(models.Model):
         verbose_name = "Probestunde"
         verbose_name_plural = "Probestunden"
         ordering = ["-scheduled_date"]
+        indexes = [
+            models.Index(
+                fields=["status", "-scheduled_date"], name="trial_status_date_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Probestunde: {self.child.user.get_full_name()} - {self.subject.name}"
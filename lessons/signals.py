@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Group, GroupEnrollment
+
+
+@receiver(pre_save, sender=GroupEnrollment)
+def remember_previous_group(sender, instance, **kwargs):
+    """Запоминает прежнюю группу зачисления перед сохранением"""
+    instance._previous_group_id = (
+        GroupEnrollment.objects.filter(pk=instance.pk)
+        .values_list("group_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=GroupEnrollment)
+@receiver(post_delete, sender=GroupEnrollment)
+def update_active_enrollment_count(sender, instance, **kwargs):
+    """Обновляет кэшированное количество активных зачислений группы"""
+    # При переводе в другую группу пересчитывается и прежняя группа
+    group_ids = {instance.group_id, getattr(instance, "_previous_group_id", None)}
+    group_ids.discard(None)
+    Group.objects.filter(pk__in=group_ids).refresh_enrollment_counts()
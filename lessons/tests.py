@@ -1,3 +1,162 @@
+from datetime import date, time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from clients.models import Child, UserProfile
+from contracts.models import Contract, ContractItem
+
+from .models import ActualLesson, Group, GroupEnrollment, Schedule, Subject
+
+
+class ActiveEnrollmentCountTests(TestCase):
+    """Сохраненное число активных зачислений совпадает с реальным"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create(username="parent")
+        UserProfile.objects.create(user=cls.parent, role="parent")
+        cls.subject = Subject.objects.create(name="Mathe", code="M1")
+        cls.contract = Contract.objects.create(
+            contract_number="V-1",
+            parent=cls.parent,
+            contract_type="monthly",
+            payment_type="sepa",
+            start_date=date.today(),
+            end_date=date.today(),
+            cancellation_deadline=date.today(),
+            created_by=cls.parent,
+        )
+        cls.group = Group.objects.create(name="A", subject=cls.subject)
+        cls.other_group = Group.objects.create(name="B", subject=cls.subject)
+
+    def enroll(self, group, status="active"):
+        """Зачисляет нового ребенка в группу"""
+        number = GroupEnrollment.objects.count() + 1
+        user = User.objects.create(username=f"child{number}")
+        child = Child.objects.create(
+            user=user, parent=self.parent, birth_date=date(2015, 1, 1)
+        )
+        item = ContractItem.objects.create(
+            contract=self.contract,
+            child=child,
+            subject=self.subject,
+            base_price=Decimal("50.00"),
+            price_date=date.today(),
+            final_price=Decimal("50.00"),
+        )
+        return GroupEnrollment.objects.create(
+            group=group,
+            child=child,
+            contract_item=item,
+            enrollment_date=date.today(),
+            status=status,
+        )
+
+    def assertStoredCount(self, group, expected):
+        group.refresh_from_db()
+        self.assertEqual(group.active_enrollment_count, expected)
+        self.assertEqual(
+            group.groupenrollment_set.filter(status="active").count(), expected
+        )
+
+    def test_count_follows_create_status_change_and_delete(self):
+        first = self.enroll(self.group)
+        self.enroll(self.group)
+        self.enroll(self.group, status="suspended")
+        self.assertStoredCount(self.group, 2)
+
+        first.status = "completed"
+        first.save()
+        self.assertStoredCount(self.group, 1)
+
+        first.delete()
+        self.assertStoredCount(self.group, 1)
+
+    def test_move_to_another_group_recounts_both_groups(self):
+        enrollments = [self.enroll(self.group) for _ in range(3)]
+        self.enroll(self.other_group)
+
+        moved = enrollments[0]
+        moved.group = self.other_group
+        moved.save()
+
+        self.assertStoredCount(self.group, 2)
+        self.assertStoredCount(self.other_group, 2)
+
+
+class ScheduleEndTimeTests(TestCase):
+    """Время окончания занятия вычисляется при сохранении"""
+
+    @classmethod
+    def setUpTestData(cls):
+        subject = Subject.objects.create(name="Mathe", code="M1")
+        cls.group = Group.objects.create(name="A", subject=subject)
+
+    def create_schedule(self, start_time, duration):
+        return Schedule.objects.create(
+            group=self.group,
+            weekday=0,
+            start_time=start_time,
+            duration=duration,
+            valid_from=date.today(),
+        )
+
+    def test_end_time_is_stored(self):
+        schedule = self.create_schedule(time(10, 15), 45)
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.end_time, time(11, 0))
+
+    def test_end_time_wraps_past_midnight(self):
+        schedule = self.create_schedule(time(23, 30), 90)
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.end_time, time(1, 0))
+
+    def test_end_time_follows_duration_change(self):
+        schedule = self.create_schedule(time(10, 0), 60)
+        schedule.duration = 90
+        schedule.save()
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.end_time, time(11, 30))
+
+
+class WasSubstitutedTests(TestCase):
+    """Признак замещения вычисляется при сохранении занятия"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username="teacher")
+        cls.substitute = User.objects.create(username="substitute")
+        subject = Subject.objects.create(name="Mathe", code="M1")
+        cls.group = Group.objects.create(name="A", subject=subject)
+
+    def create_lesson(self, actual_teacher=None):
+        return ActualLesson.objects.create(
+            group=self.group,
+            scheduled_teacher=self.teacher,
+            actual_teacher=actual_teacher,
+            scheduled_date=timezone.now(),
+            duration=60,
+            updated_by=self.teacher,
+        )
+
+    def test_flag_depends_on_actual_teacher(self):
+        self.assertFalse(self.create_lesson().was_substituted)
+        self.assertFalse(self.create_lesson(self.teacher).was_substituted)
+        self.assertTrue(self.create_lesson(self.substitute).was_substituted)
+
+    def test_flag_follows_teacher_change(self):
+        lesson = self.create_lesson(self.teacher)
+        lesson.actual_teacher = self.substitute
+        lesson.save()
+        self.assertTrue(
+            ActualLesson.objects.filter(pk=lesson.pk, was_substituted=True).exists()
+        )
 
-# Create your tests here.
+        lesson.actual_teacher = self.teacher
+        lesson.save()
+        self.assertFalse(
+            ActualLesson.objects.filter(pk=lesson.pk, was_substituted=True).exists()
+        )
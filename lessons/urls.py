@@ -1,49 +1,65 @@
-from django.urls import path
+from django.urls import include, path
 
 from . import views
 
 app_name = "lessons"
 
-urlpatterns = [
-    # Главная страница уроков
-    path("", views.lessons_index_view, name="lessons_index"),
-    # Предметы и группы
-    path("subjects/", views.subjects_list_view, name="subjects_list"),
-    path("groups/", views.groups_list_view, name="groups_list"),
-    path("groups/<int:group_id>/", views.group_detail_view, name="group_detail"),
+# Маршруты сгруппированы по общим префиксам: резолвер проверяет префикс один раз
+# и не перебирает вложенные маршруты других разделов
+group_patterns = [
+    path("", views.groups_list_view, name="groups_list"),
+    path("<int:group_id>/", views.group_detail_view, name="group_detail"),
     path(
-        "groups/<int:group_id>/schedule/",
+        "<int:group_id>/schedule/",
         views.group_schedule_view,
         name="group_schedule",
     ),
-    # Для учителей
-    path("teacher/lessons/", views.teacher_lessons_view, name="teacher_lessons"),
-    path(
-        "teacher/lessons/<int:lesson_id>/",
-        views.teacher_lesson_detail,
-        name="teacher_lesson_detail",
-    ),
+]
+
+teacher_lesson_patterns = [
+    path("", views.teacher_lessons_view, name="teacher_lessons"),
+    path("<int:lesson_id>/", views.teacher_lesson_detail, name="teacher_lesson_detail"),
     path(
-        "teacher/lessons/<int:lesson_id>/attendance/",
+        "<int:lesson_id>/attendance/",
         views.mark_lesson_attendance,
         name="mark_lesson_attendance",
     ),
     path(
-        "teacher/lessons/<int:lesson_id>/content/",
+        "<int:lesson_id>/content/",
         views.update_lesson_content,
         name="update_lesson_content",
     ),
-    path("teacher/groups/", views.teacher_groups_view, name="teacher_groups"),
-    path("teacher/students/", views.teacher_students_view, name="teacher_students"),
+]
+
+teacher_patterns = [
+    path("lessons/", include(teacher_lesson_patterns)),
+    path("groups/", views.teacher_groups_view, name="teacher_groups"),
+    path("students/", views.teacher_students_view, name="teacher_students"),
+]
+
+schedule_patterns = [
+    path("", views.schedule_view, name="schedule"),
+    path("week/", views.weekly_schedule_view, name="weekly_schedule"),
+]
+
+trial_patterns = [
+    path("", views.trial_lessons_view, name="trial_lessons"),
+    path("book/", views.book_trial_lesson, name="book_trial_lesson"),
+    path("<int:trial_id>/", views.trial_lesson_detail, name="trial_lesson_detail"),
+]
+
+urlpatterns = [
+    # Главная страница уроков
+    path("", views.lessons_index_view, name="lessons_index"),
+    # Предметы и группы
+    path("subjects/", views.subjects_list_view, name="subjects_list"),
+    path("groups/", include(group_patterns)),
+    # Для учителей
+    path("teacher/", include(teacher_patterns)),
     # Расписание
-    path("schedule/", views.schedule_view, name="schedule"),
-    path("schedule/week/", views.weekly_schedule_view, name="weekly_schedule"),
+    path("schedule/", include(schedule_patterns)),
     # Пробные занятия
-    path("trials/", views.trial_lessons_view, name="trial_lessons"),
-    path("trials/book/", views.book_trial_lesson, name="book_trial_lesson"),
-    path(
-        "trials/<int:trial_id>/", views.trial_lesson_detail, name="trial_lesson_detail"
-    ),
+    path("trials/", include(trial_patterns)),
     # Посещаемость и пропуски
     path("attendance/", views.attendance_view, name="attendance"),
     path("absences/", views.absences_view, name="absences"),
@@ -1,12 +1,15 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Count, Q
-from django.http import JsonResponse
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, Q
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.dateparse import parse_time
 from django.views.decorators.http import require_POST
 
 from clients.models import Child
+from contracts.cache import get_active_subjects_cached, get_subject_catalog_cached
+from educational_center.json_utils import json_response
+from educational_center.pagination import paginate
 
 from .forms import ActualLessonForm, LessonAttendanceForm, TrialLessonBookingForm
 from .models import (
@@ -16,11 +19,25 @@ from .models import (
     Group,
     GroupEnrollment,
     Schedule,
-    Subject,
     TrialLesson,
+    teachers_prefetch,
 )
 
 
+# Размеры страниц списков
+LESSONS_PAGE_SIZE = 50
+TRIALS_PAGE_SIZE = 25
+ABSENCES_PAGE_SIZE = 50
+
+
+def _posted_time(value):
+    """Разбирает время из POST-данных, некорректные значения игнорируются"""
+    try:
+        return parse_time(value) if value else None
+    except ValueError:
+        return None
+
+
 @login_required
 def teacher_lesson_detail(request, lesson_id):
     """Детальная страница занятия для учителя"""
@@ -29,22 +46,27 @@ def teacher_lesson_detail(request, lesson_id):
         return redirect("login")
 
     lesson = get_object_or_404(
-        ActualLesson, id=lesson_id, scheduled_teacher=request.user
+        ActualLesson.objects.select_related("group__subject"),
+        id=lesson_id,
+        scheduled_teacher=request.user,
     )
 
-    # Получаем всех студентов группы
-    enrolled_students = lesson.group.groupenrollment_set.filter(
-        status="active"
-    ).select_related("child__user")
-
-    # Получаем записи посещаемости
-    attendance_records = lesson.attendance_records.all()
+    # Получаем записи посещаемости; ученики берутся из зачислений, шаблону нужен статус
+    attendance_records = lesson.attendance_records.only("id", "child_id", "status")
     attendance_dict = {record.child_id: record for record in attendance_records}
 
+    # Получаем всех студентов группы вместе с их отметками посещаемости
+    enrolled_students = list(
+        lesson.group.groupenrollment_set.filter(status="active").select_related(
+            "child__user"
+        )
+    )
+    for enrollment in enrolled_students:
+        enrollment.attendance = attendance_dict.get(enrollment.child_id)
+
     context = {
         "lesson": lesson,
         "enrolled_students": enrolled_students,
-        "attendance_dict": attendance_dict,
     }
 
     return render(request, "lessons/teacher_lesson_detail.html", context)
@@ -55,10 +77,12 @@ def teacher_lesson_detail(request, lesson_id):
 def mark_lesson_attendance(request, lesson_id):
     """Отмечает посещаемость занятия"""
     if not request.user.userprofile.is_teacher:
-        return JsonResponse({"error": "Zugriff verweigert"}, status=403)
+        return json_response({"error": "Zugriff verweigert"}, status=403)
 
     lesson = get_object_or_404(
-        ActualLesson, id=lesson_id, scheduled_teacher=request.user
+        ActualLesson.objects.select_related("group"),
+        id=lesson_id,
+        scheduled_teacher=request.user,
     )
 
     # Обновляем статус занятия
@@ -71,42 +95,59 @@ def mark_lesson_attendance(request, lesson_id):
     lesson.lesson_content = request.POST.get("lesson_content", "")
     lesson.homework_assigned = request.POST.get("homework_assigned", "")
     lesson.notes = request.POST.get("notes", "")
-    lesson.save()
 
     # Обрабатываем посещаемость
-    enrolled_students = lesson.group.groupenrollment_set.filter(status="active")
+    enrolled_child_ids = lesson.group.groupenrollment_set.filter(
+        status="active"
+    ).values_list("child_id", flat=True)
 
-    for enrollment in enrolled_students:
-        child = enrollment.child
-        attendance_status = request.POST.get(f"attendance_{child.id}", "absent")
-        arrival_time = request.POST.get(f"arrival_time_{child.id}")
-        departure_time = request.POST.get(f"departure_time_{child.id}")
-        notes = request.POST.get(f"notes_{child.id}", "")
-
-        # Создаем или обновляем запись посещаемости
-        attendance, created = AttendanceRecord.objects.get_or_create(
+    records = [
+        AttendanceRecord(
             lesson=lesson,
-            child=child,
-            defaults={"status": attendance_status, "marked_by": request.user},
+            child_id=child_id,
+            status=request.POST.get(f"attendance_{child_id}", "absent"),
+            arrival_time=_posted_time(request.POST.get(f"arrival_time_{child_id}")),
+            departure_time=_posted_time(request.POST.get(f"departure_time_{child_id}")),
+            notes=request.POST.get(f"notes_{child_id}", ""),
+            marked_by=request.user,
+        )
+        for child_id in enrolled_child_ids
+    ]
+
+    with transaction.atomic():
+        lesson.save()
+
+        # Создаем или обновляем записи посещаемости одним INSERT ... ON CONFLICT
+        AttendanceRecord.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=["lesson", "child"],
+            update_fields=["status", "arrival_time", "departure_time", "notes"],
         )
-
-        if not created:
-            attendance.status = attendance_status
-            attendance.notes = notes
-            attendance.save()
 
         # Если студент отсутствовал, создаем запись в истории пропусков
-        if attendance_status in ["absent", "excused"]:
-            AbsenceHistory.objects.get_or_create(
-                child=child,
+        recorded_absences = set(
+            AbsenceHistory.objects.filter(
                 lesson_date=lesson.scheduled_date,
-                subject=lesson.group.subject,
+                subject_id=lesson.group.subject_id,
                 group=lesson.group,
-                defaults={
-                    "absence_type": attendance_status,
-                    "excuse_provided": attendance_status == "excused",
-                },
-            )
+            ).values_list("child_id", flat=True)
+        )
+        AbsenceHistory.objects.bulk_create(
+            [
+                AbsenceHistory(
+                    child_id=record.child_id,
+                    lesson_date=lesson.scheduled_date,
+                    subject_id=lesson.group.subject_id,
+                    group=lesson.group,
+                    absence_type=record.status,
+                    excuse_provided=record.status == "excused",
+                )
+                for record in records
+                if record.status in ["absent", "excused"]
+                and record.child_id not in recorded_absences
+            ]
+        )
 
     messages.success(request, "Anwesenheit wurde erfolgreich markiert.")
     return redirect("clients:teacher_dashboard")
@@ -143,9 +184,7 @@ def update_lesson_content(request, lesson_id):
 @login_required
 def subjects_list_view(request):
     """Список предметов"""
-    subjects = Subject.objects.filter(is_active=True).order_by("name")
-
-    context = {"subjects": subjects, "title": "Verfügbare Fächer"}
+    context = {"subjects": get_subject_catalog_cached(), "title": "Verfügbare Fächer"}
 
     return render(request, "lessons/subjects_list.html", context)
 
@@ -153,11 +192,7 @@ def subjects_list_view(request):
 @login_required
 def groups_list_view(request):
     """Список групп"""
-    groups = (
-        Group.objects.filter(is_active=True)
-        .select_related("subject")
-        .prefetch_related("teachers")
-    )
+    groups = Group.objects.filter(is_active=True).with_relations()
 
     # Фильтрация
     subject_filter = request.GET.get("subject")
@@ -166,11 +201,11 @@ def groups_list_view(request):
 
     # Только группы с доступными местами
     if request.GET.get("available_only") == "true":
-        groups = [g for g in groups if not g.is_full]
+        groups = groups.filter(active_enrollment_count__lt=F("max_students"))
 
     context = {
         "groups": groups,
-        "subjects": Subject.objects.filter(is_active=True),
+        "subjects": get_active_subjects_cached(),
         "subject_filter": subject_filter,
         "title": "Gruppen",
     }
@@ -181,14 +216,15 @@ def groups_list_view(request):
 @login_required
 def group_detail_view(request, group_id):
     """Детальная страница группы"""
-    group = get_object_or_404(Group, id=group_id)
+    group = get_object_or_404(Group.objects.with_relations(), id=group_id)
 
     # Получаем расписание группы
     schedules = group.schedules.filter(is_active=True).order_by("weekday", "start_time")
 
-    # Получаем зачисленных студентов
-    enrollments = group.groupenrollment_set.filter(status="active").select_related(
-        "child__user"
+    # Получаем зачисленных студентов одним запросом: список нужен и для проверки
+    # доступа, и для вывода
+    enrollments = list(
+        group.groupenrollment_set.filter(status="active").select_related("child__user")
     )
 
     # Проверяем, может ли пользователь видеть эту информацию
@@ -197,12 +233,14 @@ def group_detail_view(request, group_id):
         can_view_details = True
     elif request.user.userprofile.is_parent:
         # Родитель может видеть, если его ребенок в группе
-        child_in_group = enrollments.filter(child__parent=request.user).exists()
-        can_view_details = child_in_group
+        can_view_details = any(
+            enrollment.child.parent_id == request.user.id for enrollment in enrollments
+        )
     elif request.user.userprofile.is_child:
         # Ребенок может видеть, если он в группе
-        child_in_group = enrollments.filter(child__user=request.user).exists()
-        can_view_details = child_in_group
+        can_view_details = any(
+            enrollment.child.user_id == request.user.id for enrollment in enrollments
+        )
 
     context = {
         "group": group,
@@ -218,7 +256,7 @@ def group_detail_view(request, group_id):
 @login_required
 def group_schedule_view(request, group_id):
     """Расписание конкретной группы"""
-    group = get_object_or_404(Group, id=group_id)
+    group = get_object_or_404(Group.objects.with_relations(), id=group_id)
 
     schedules = group.schedules.filter(is_active=True).order_by("weekday", "start_time")
 
@@ -244,31 +282,63 @@ def teacher_lessons_view(request):
     status_filter = request.GET.get("status", "all")
     date_filter = request.GET.get("date", "week")
 
-    lessons = ActualLesson.objects.filter(
-        Q(scheduled_teacher=request.user) | Q(actual_teacher=request.user)
-    ).select_related("group__subject")
+    filters = {}
 
     # Фильтр по статусу
     if status_filter != "all":
-        lessons = lessons.filter(status=status_filter)
+        filters["status"] = status_filter
 
     # Фильтр по дате
     today = date.today()
     if date_filter == "today":
-        lessons = lessons.filter(scheduled_date__date=today)
+        filters["scheduled_date__date"] = today
     elif date_filter == "week":
         week_start = today - timedelta(days=today.weekday())
         week_end = week_start + timedelta(days=6)
-        lessons = lessons.filter(scheduled_date__date__range=[week_start, week_end])
+        filters["scheduled_date__date__range"] = [week_start, week_end]
     elif date_filter == "month":
-        lessons = lessons.filter(
-            scheduled_date__year=today.year, scheduled_date__month=today.month
-        )
+        filters["scheduled_date__year"] = today.year
+        filters["scheduled_date__month"] = today.month
+
+    # Запланированные и проведенные учителем занятия выбираются отдельно по своим
+    # индексам и объединяются через UNION вместо OR по двум столбцам
+    fields = (
+        "id",
+        "scheduled_date",
+        "status",
+        "lesson_content",
+        "group__name",
+        "group__subject__name",
+    )
+    scheduled = ActualLesson.objects.filter(scheduled_teacher=request.user, **filters)
+    substituted = ActualLesson.objects.filter(actual_teacher=request.user, **filters)
+    page_obj = paginate(
+        request,
+        scheduled.order_by()
+        .values(*fields)
+        .union(substituted.order_by().values(*fields))
+        .order_by("-scheduled_date"),
+        LESSONS_PAGE_SIZE,
+    )
 
-    lessons = lessons.order_by("-scheduled_date")
+    # Строки собираются из values() без создания экземпляров моделей
+    lessons = [
+        {
+            "id": row["id"],
+            "scheduled_date": row["scheduled_date"],
+            "status": row["status"],
+            "lesson_content": row["lesson_content"],
+            "group": {
+                "name": row["group__name"],
+                "subject": {"name": row["group__subject__name"]},
+            },
+        }
+        for row in page_obj
+    ]
 
     context = {
         "lessons": lessons,
+        "page_obj": page_obj,
         "status_filter": status_filter,
         "date_filter": date_filter,
         "lesson_statuses": ActualLesson.LESSON_STATUS,
@@ -288,7 +358,17 @@ def teacher_groups_view(request):
     groups = (
         Group.objects.filter(teachers=request.user, is_active=True)
         .select_related("subject")
-        .prefetch_related("groupenrollment_set__child__user")
+        .prefetch_related(
+            Prefetch(
+                "groupenrollment_set",
+                queryset=GroupEnrollment.objects.select_related("child__user").only(
+                    "group",
+                    "child__user",
+                    "child__user__first_name",
+                    "child__user__last_name",
+                ),
+            )
+        )
     )
 
     context = {"groups": groups, "title": "Meine Gruppen"}
@@ -330,7 +410,7 @@ def schedule_view(request):
     schedules = (
         Schedule.objects.filter(is_active=True)
         .select_related("group__subject")
-        .prefetch_related("group__teachers")
+        .prefetch_related(teachers_prefetch("group__teachers"))
         .order_by("weekday", "start_time")
     )
 
@@ -359,18 +439,17 @@ def weekly_schedule_view(request):
     schedules = (
         Schedule.objects.filter(is_active=True)
         .select_related("group__subject")
-        .prefetch_related("group__teachers")
+        .prefetch_related(teachers_prefetch("group__teachers"))
         .order_by("weekday", "start_time")
     )
 
     # Если пользователь - ребенок, показываем только его расписание
     if request.user.userprofile.is_child:
-        try:
-            child = Child.objects.get(user=request.user)
-            child_groups = [e.group for e in child.active_enrollments]
-            schedules = schedules.filter(group__in=child_groups)
-        except Child.DoesNotExist:
-            schedules = Schedule.objects.none()
+        schedules = schedules.filter(
+            group__in=GroupEnrollment.objects.filter(
+                child__user=request.user, status="active"
+            ).values("group")
+        )
 
     # Если пользователь - учитель, показываем его группы
     elif request.user.userprofile.is_teacher:
@@ -390,35 +469,34 @@ def trial_lessons_view(request):
             "-scheduled_date"
         )
     elif request.user.userprofile.is_child:
-        try:
-            child = Child.objects.get(user=request.user)
-            trials = TrialLesson.objects.filter(child=child).order_by("-scheduled_date")
-        except Child.DoesNotExist:
-            trials = TrialLesson.objects.none()
+        trials = TrialLesson.objects.filter(child__user=request.user).order_by(
+            "-scheduled_date"
+        )
     else:
         trials = TrialLesson.objects.all().order_by("-scheduled_date")
 
-    # Статистики для отображения
-    total_trials = trials.count()
-    scheduled_count = trials.filter(status="scheduled").count()
-    conducted_count = trials.filter(
-        status="completed"
-    ).count()  # исправлено с "conducted" на "completed"
-    cancelled_count = trials.filter(status="cancelled").count()
-    no_show_count = trials.filter(status="no_show").count()
-    interested_count = trials.filter(
-        enrolled_after_trial=True
-    ).count()  # используем enrolled_after_trial
+    # Статистики для отображения одним агрегирующим запросом
+    stats = trials.aggregate(
+        total=Count("id"),
+        scheduled=Count("id", filter=Q(status="scheduled")),
+        conducted=Count("id", filter=Q(status="completed")),
+        cancelled=Count("id", filter=Q(status="cancelled")),
+        no_show=Count("id", filter=Q(status="no_show")),
+        interested=Count("id", filter=Q(enrolled_after_trial=True)),
+    )
+
+    page_obj = paginate(request, trials, TRIALS_PAGE_SIZE)
 
     context = {
-        "trials": trials,
+        "trials": page_obj,
+        "page_obj": page_obj,
         "title": "Probestunden",
-        "total_trials": total_trials,
-        "scheduled_count": scheduled_count,
-        "conducted_count": conducted_count,
-        "cancelled_count": cancelled_count,
-        "no_show_count": no_show_count,
-        "interested_count": interested_count,
+        "total_trials": stats["total"],
+        "scheduled_count": stats["scheduled"],
+        "conducted_count": stats["conducted"],
+        "cancelled_count": stats["cancelled"],
+        "no_show_count": stats["no_show"],
+        "interested_count": stats["interested"],
     }
 
     return render(request, "lessons/trial_lessons.html", context)
@@ -475,13 +553,9 @@ def trial_lesson_detail(request, trial_id):
 def attendance_view(request):
     """Посещаемость"""
     if request.user.userprofile.is_child:
-        try:
-            child = Child.objects.get(user=request.user)
-            base_absences = AbsenceHistory.objects.filter(child=child).order_by(
-                "-lesson_date"
-            )
-        except Child.DoesNotExist:
-            base_absences = AbsenceHistory.objects.none()
+        base_absences = AbsenceHistory.objects.filter(
+            child__user=request.user
+        ).order_by("-lesson_date")
     elif request.user.userprofile.is_parent:
         children = Child.objects.filter(parent=request.user, is_active=True)
         base_absences = AbsenceHistory.objects.filter(child__in=children).order_by(
@@ -490,29 +564,33 @@ def attendance_view(request):
     else:
         base_absences = AbsenceHistory.objects.all().order_by("-lesson_date")
 
-    # Статистики для отображения (без среза)
-    total_absences = base_absences.count()
-    absent_count = base_absences.filter(absence_type="absent").count()
-    excused_count = base_absences.filter(absence_type="excused").count()
-    late_count = base_absences.filter(absence_type="late").count()
-    sick_count = base_absences.filter(absence_type="sick").count()
+    # Статистики для отображения (без среза) одним агрегирующим запросом
+    stats = base_absences.aggregate(
+        total=Count("id"),
+        absent=Count("id", filter=Q(absence_type="absent")),
+        excused=Count("id", filter=Q(absence_type="excused")),
+        late=Count("id", filter=Q(absence_type="late")),
+        sick=Count("id", filter=Q(absence_type="sick")),
+    )
 
-    # Применяем срез только для отображения списка
-    if request.user.userprofile.is_child:
-        absences = base_absences[:20]
-    elif request.user.userprofile.is_parent:
-        absences = base_absences[:50]
-    else:
-        absences = base_absences[:100]
+    # Постраничный вывод только для списка; текстовые поля списку не нужны
+    page_obj = paginate(
+        request,
+        base_absences.select_related("child__user", "subject", "group").defer(
+            "excuse_reason", "subject__description", "subject__required_materials"
+        ),
+        ABSENCES_PAGE_SIZE,
+    )
 
     context = {
-        "absences": absences,
+        "absences": page_obj,
+        "page_obj": page_obj,
         "title": "Anwesenheit",
-        "total_absences": total_absences,
-        "absent_count": absent_count,
-        "excused_count": excused_count,
-        "late_count": late_count,
-        "sick_count": sick_count,
+        "total_absences": stats["total"],
+        "absent_count": stats["absent"],
+        "excused_count": stats["excused"],
+        "late_count": stats["late"],
+        "sick_count": stats["sick"],
     }
 
     return render(request, "lessons/attendance.html", context)
@@ -1,8 +1,10 @@
 from django.contrib import admin
+from django.contrib.auth.models import User
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.db.models import Count, Q
+from .cache import invalidate_notification_counts
 from .models import Notification, ChangeLog
 
 
@@ -63,19 +65,13 @@ class NotificationAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Оптимизация запросов"""
         qs = super().get_queryset(request)
-        return qs.select_related('recipient', 'content_type')
+        return qs.select_related('recipient', 'content_type').defer('message')
     
     actions = ['mark_as_read', 'mark_as_important', 'send_reminder']
     
     def mark_as_read(self, request, queryset):
         """Отмечает уведомления как прочитанные"""
-        from django.utils import timezone
-        updated = 0
-        for notification in queryset.filter(is_read=False):
-            notification.is_read = True
-            notification.read_at = timezone.now()
-            notification.save()
-            updated += 1
+        updated = queryset.mark_read()
         self.message_user(request, f'{updated} Benachrichtigungen wurden als gelesen markiert.')
     mark_as_read.short_description = 'Als gelesen markieren'
     
@@ -92,21 +88,25 @@ class NotificationAdmin(admin.ModelAdmin):
             is_read=False,
             requires_acknowledgment=True,
             acknowledged_at__isnull=True
-        )
+        ).values_list('recipient_id', 'title', 'message', 'content_type_id', 'object_id')
         
-        reminded = 0
-        for notification in critical_unread:
-            # Создаем напоминание
-            Notification.objects.create(
-                recipient=notification.recipient,
+        reminders = []
+        for recipient_id, title, message, content_type_id, object_id in critical_unread:
+            # Создаем напоминание; связанный объект копируется по ключам без загрузки
+            reminders.append(Notification(
+                recipient_id=recipient_id,
                 notification_type='general',
                 priority='critical',
-                title=f'ERINNERUNG: {notification.title}',
-                message=f'Sie haben eine wichtige Benachrichtigung noch nicht bestaetigt:\n\n{notification.message}',
+                title=f'ERINNERUNG: {title}',
+                message=f'Sie haben eine wichtige Benachrichtigung noch nicht bestaetigt:\n\n{message}',
                 requires_acknowledgment=True,
-                content_object=notification.content_object
-            )
-            reminded += 1
+                content_type_id=content_type_id,
+                object_id=object_id
+            ))
+        Notification.objects.bulk_create(reminders, batch_size=500)
+        # bulk_create() не отправляет сигналы, поэтому кэш счетчиков сбрасывается явно
+        invalidate_notification_counts(*{reminder.recipient_id for reminder in reminders})
+        reminded = len(reminders)
         
         self.message_user(request, f'{reminded} Erinnerungen wurden gesendet.')
     send_reminder.short_description = 'Erinnerungen senden'
@@ -154,7 +154,9 @@ from django.contrib.admin.views.decorators import staff_member_required
 def notification_stats(request):
     """Страница статистики уведомлений"""
     from django.db.models import Count, Q
-    from datetime import datetime, timedelta
+    from django.db.models.functions import TruncDate
+    from django.utils import timezone
+    from datetime import timedelta
     
     # Общая статистика
     total_notifications = Notification.objects.count()
@@ -179,12 +181,12 @@ def notification_stats(request):
     ).order_by('-unread_count')[:10]
     
     # Статистика за последние 7 дней
-    week_ago = datetime.now() - timedelta(days=7)
-    recent_stats = Notification.objects.filter(created_at__gte=week_ago).values(
-        'created_at__date'
-    ).annotate(
+    week_ago = timezone.now() - timedelta(days=7)
+    recent_stats = Notification.objects.filter(created_at__gte=week_ago).annotate(
+        day=TruncDate('created_at')
+    ).values('day').annotate(
         count=Count('id')
-    ).order_by('created_at__date')
+    ).order_by('day')
     
     context = {
         'title': 'Benachrichtigungsstatistik',
@@ -214,8 +216,6 @@ class NotificationAdminSite(admin.AdminSite):
 # Регистрация кастомных действий
 def create_sample_notifications(modeladmin, request, queryset):
     """Создает тестовые уведомления для выбранных пользователей"""
-    from django.contrib.auth.models import User
-    
     created = 0
     for user in User.objects.filter(is_active=True)[:5]:  # Только первые 5 активных пользователей
         Notification.objects.create(
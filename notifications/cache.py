@@ -0,0 +1,32 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+NOTIFICATION_COUNTS_KEY = "notification_counts:{}"
+NOTIFICATION_COUNTS_TIMEOUT = 30
+
+
+def get_notification_counts_cached(user_id):
+    """Число непрочитанных и неподтвержденных критичных уведомлений (кэш 30 секунд)"""
+    from .models import Notification
+
+    def load():
+        return Notification.objects.filter(recipient_id=user_id).aggregate(
+            unread=Count("id", filter=Q(is_read=False)),
+            critical=Count(
+                "id",
+                filter=Q(
+                    priority="critical",
+                    requires_acknowledgment=True,
+                    acknowledged_at__isnull=True,
+                ),
+            ),
+        )
+
+    return cache.get_or_set(
+        NOTIFICATION_COUNTS_KEY.format(user_id), load, NOTIFICATION_COUNTS_TIMEOUT
+    )
+
+
+def invalidate_notification_counts(*user_ids):
+    """Сбрасывает кэш счетчиков уведомлений пользователей"""
+    cache.delete_many([NOTIFICATION_COUNTS_KEY.format(user_id) for user_id in user_ids])
@@ -1,23 +1,18 @@
-from .models import Notification
+from .cache import get_notification_counts_cached
 
 
 def notifications_context(request):
     """Контекст-процессор для уведомлений"""
     if request.user.is_authenticated:
-        unread_count = Notification.objects.filter(
-            recipient=request.user, is_read=False
-        ).count()
-
-        critical_count = Notification.objects.filter(
-            recipient=request.user,
-            priority="critical",
-            requires_acknowledgment=True,
-            acknowledged_at__isnull=True,
-        ).count()
+        # Счетчики берутся из кэша и запоминаются на время запроса
+        counts = getattr(request, "_notification_counts", None)
+        if counts is None:
+            counts = get_notification_counts_cached(request.user.id)
+            request._notification_counts = counts
 
         return {
-            "unread_notifications_count": unread_count,
-            "critical_notifications_count": critical_count,
+            "unread_notifications_count": counts["unread"],
+            "critical_notifications_count": counts["critical"],
         }
 
     return {
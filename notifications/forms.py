@@ -40,10 +40,10 @@ class SendNotificationForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # Фильтруем получателей по ролям
+        # Фильтруем получателей по ролям; для подписи чекбокса нужен только username
         self.fields["recipients"].queryset = User.objects.filter(
             is_active=True, userprofile__role__in=["parent", "child", "teacher"]
-        ).select_related("userprofile")
+        ).only("id", "username")
 
         self.helper = FormHelper()
         self.helper.layout = Layout(
@@ -2,7 +2,9 @@ import random
 
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
+from notifications.cache import invalidate_notification_counts
 from notifications.models import Notification
 
 
@@ -18,8 +20,10 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        users = User.objects.filter(
-            is_active=True, userprofile__role__in=["parent", "teacher"]
+        user_ids = list(
+            User.objects.filter(
+                is_active=True, userprofile__role__in=["parent", "teacher"]
+            ).values_list("id", flat=True)
         )
 
         notification_templates = [
@@ -50,21 +54,32 @@ class Command(BaseCommand):
             },
         ]
 
-        created = 0
-        for _ in range(options["count"]):
-            user = random.choice(users)
+        notifications = []
+        # Получатели выбираются одним вызовом для всех уведомлений
+        for recipient_id in random.choices(user_ids, k=options["count"]):
             template = random.choice(notification_templates)
 
-            Notification.objects.create(
-                recipient=user,
-                notification_type=template["type"],
-                priority=template["priority"],
-                title=template["title"],
-                message=template["message"],
-                requires_acknowledgment=template.get("requires_acknowledgment", False),
-                is_important=template["priority"] in ["high", "critical"],
+            notifications.append(
+                Notification(
+                    recipient_id=recipient_id,
+                    notification_type=template["type"],
+                    priority=template["priority"],
+                    title=template["title"],
+                    message=template["message"],
+                    requires_acknowledgment=template.get(
+                        "requires_acknowledgment", False
+                    ),
+                    is_important=template["priority"] in ["high", "critical"],
+                )
             )
-            created += 1
+
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications, batch_size=1000)
+        # bulk_create() не отправляет сигналы, поэтому кэш счетчиков сбрасывается явно
+        invalidate_notification_counts(
+            *{notification.recipient_id for notification in notifications}
+        )
+        created = len(notifications)
 
         self.stdout.write(
             self.style.SUCCESS(f"✓ Создано {created} тестовых уведомлений")
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-15 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "priority", "acknowledged_at"],
+                name="notif_recipient_priority_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("requires_acknowledgment", True)),
+                fields=["priority", "is_read", "acknowledged_at"],
+                name="notif_ack_pending_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-15 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0002_notification_ack_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="notification",
+            name="notif_recipient_priority_idx",
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(
+                    ("priority", "critical"), ("requires_acknowledgment", True)
+                ),
+                fields=["recipient", "acknowledged_at"],
+                name="notif_crit_unack_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-15 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0003_critical_unacknowledged_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("is_read", False)),
+                fields=["recipient"],
+                name="notif_unread_by_user_idx",
+            ),
+        ),
+    ]
@@ -6,6 +6,23 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
+class NotificationQuerySet(models.QuerySet):
+    """QuerySet уведомлений"""
+
+    def mark_read(self):
+        """Отмечает непрочитанные уведомления выборки прочитанными одним UPDATE"""
+        from .cache import invalidate_notification_counts
+
+        unread = self.filter(is_read=False)
+        recipient_ids = list(
+            unread.order_by().values_list("recipient_id", flat=True).distinct()
+        )
+        updated = unread.update(is_read=True, read_at=timezone.now())
+        # update() не отправляет сигналы, поэтому кэш счетчиков сбрасывается явно
+        invalidate_notification_counts(*recipient_ids)
+        return updated
+
+
 class Notification(models.Model):
     """Модель уведомлений"""
 
@@ -20,6 +37,7 @@ class Notification(models.Model):
         ("request_status", "Antragsstatus"),  # Статус заявки
         ("general", "Allgemeine Mitteilung"),  # Общее уведомление
     ]
+    _TYPE_MAP = dict(NOTIFICATION_TYPES)
 
     PRIORITY_LEVELS = [
         ("low", "Niedrig"),
@@ -65,6 +83,8 @@ class Notification(models.Model):
     object_id = models.PositiveIntegerField(null=True, blank=True)
     content_object = GenericForeignKey("content_type", "object_id")
 
+    objects = NotificationQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Benachrichtigung"
         verbose_name_plural = "Benachrichtigungen"
@@ -73,6 +93,24 @@ class Notification(models.Model):
             models.Index(fields=["recipient", "is_read"]),
             models.Index(fields=["notification_type"]),
             models.Index(fields=["priority"]),
+            # Непрочитанные уведомления пользователя (счетчик и mark_all_read)
+            models.Index(
+                fields=["recipient"],
+                name="notif_unread_by_user_idx",
+                condition=models.Q(is_read=False),
+            ),
+            # Счетчик критичных неподтвержденных уведомлений пользователя
+            models.Index(
+                fields=["recipient", "acknowledged_at"],
+                name="notif_crit_unack_idx",
+                condition=models.Q(priority="critical", requires_acknowledgment=True),
+            ),
+            # Выборка критичных неподтвержденных уведомлений для напоминаний
+            models.Index(
+                fields=["priority", "is_read", "acknowledged_at"],
+                name="notif_ack_pending_idx",
+                condition=models.Q(requires_acknowledgment=True),
+            ),
         ]
 
     def __str__(self):
@@ -88,8 +126,6 @@ class Notification(models.Model):
     def acknowledge(self):
         """Подтверждает получение критичного уведомления"""
         if self.requires_acknowledgment and not self.acknowledged_at:
-            from django.utils import timezone
-
             self.acknowledged_at = timezone.now()
             self.save(update_fields=["acknowledged_at"])
 
@@ -123,40 +159,66 @@ class ChangeLog(models.Model):
 
 
 # Utility functions for notifications
+def related_object_fields(obj):
+    """Поля связи уведомления с объектом; тип содержимого определяется один раз"""
+    return {
+        "content_type_id": ContentType.objects.get_for_model(obj).id,
+        "object_id": obj.pk,
+    }
+
+
+def bulk_notify(notifications):
+    """Сохраняет уведомления пакетными INSERT и сбрасывает кэш счетчиков получателей"""
+    from .cache import invalidate_notification_counts
+
+    Notification.objects.bulk_create(notifications, batch_size=500)
+    # bulk_create() не отправляет сигналы, поэтому кэш счетчиков сбрасывается явно
+    invalidate_notification_counts(
+        *{notification.recipient_id for notification in notifications}
+    )
+
+
 def notify_contract_change(contract, change_description, changed_by):
     """
     Уведомляет всех заинтересованных при изменении контракта
     """
-    from django.contrib.auth.models import User
-
     # Уведомляем клиента
     parent = contract.parent
 
     # Определяем приоритет для SEPA клиентов
     priority = "critical" if contract.payment_type == "sepa" else "high"
     requires_ack = contract.payment_type == "sepa"
+    related = related_object_fields(contract)
 
-    Notification.objects.create(
-        recipient=parent,
-        notification_type="contract_change",
-        priority=priority,
-        title=f"Vertragsaenderung - Vertrag {contract.contract_number}",
-        message=f"Ihr Vertrag wurde geaendert: {change_description}",
-        requires_acknowledgment=requires_ack,
-        content_object=contract,
-    )
+    notifications = [
+        Notification(
+            recipient=parent,
+            notification_type="contract_change",
+            priority=priority,
+            title=f"Vertragsaenderung - Vertrag {contract.contract_number}",
+            message=f"Ihr Vertrag wurde geaendert: {change_description}",
+            requires_acknowledgment=requires_ack,
+            **related,
+        )
+    ]
 
     # Уведомляем всех бухгалтеров
-    accountants = User.objects.filter(userprofile__role="accountant")
-    for accountant in accountants:
-        Notification.objects.create(
-            recipient=accountant,
+    accountant_ids = User.objects.filter(userprofile__role="accountant").values_list(
+        "id", flat=True
+    )
+    notifications += [
+        Notification(
+            recipient_id=accountant_id,
             notification_type="contract_change",
             priority="normal",
             title=f"Vertragsaenderung - {parent.get_full_name()}",
             message=f"Vertrag {contract.contract_number} wurde geaendert von {changed_by.get_full_name()}: {change_description}",
-            content_object=contract,
+            **related,
         )
+        for accountant_id in accountant_ids
+    ]
+
+    bulk_notify(notifications)
 
 
 def notify_price_change(price_list, changed_by):
@@ -165,38 +227,55 @@ def notify_price_change(price_list, changed_by):
     """
     from contracts.models import Contract
 
-    # Находим всех клиентов, затронутых изменением цены
-    affected_contracts = Contract.objects.filter(
-        items__subject=price_list.subject, status="active"
-    ).distinct()
-
-    for contract in affected_contracts:
-        parent = contract.parent
-        priority = "critical" if contract.payment_type == "sepa" else "high"
-
-        Notification.objects.create(
-            recipient=parent,
-            notification_type="price_change",
-            priority=priority,
-            title=f"Preisaenderung - {price_list.subject.name}",
-            message=f"Der Preis fuer {price_list.subject.name} wurde auf {price_list.price_per_hour}€ pro Stunde geaendert, gueltig ab {price_list.valid_from}",
-            requires_acknowledgment=(priority == "critical"),
-            content_object=price_list,
+    # Находим всех клиентов, затронутых изменением цены, одним запросом без
+    # загрузки договоров
+    affected_contracts = list(
+        Contract.objects.filter(items__subject=price_list.subject, status="active")
+        .order_by()
+        .values_list("id", "parent_id", "payment_type")
+        .distinct()
+    )
+    # Родитель с несколькими договорами получает одно уведомление; договор с SEPA
+    # делает его критичным
+    parent_sepa = {}
+    for contract_id, parent_id, payment_type in affected_contracts:
+        parent_sepa[parent_id] = parent_sepa.get(parent_id) or payment_type == "sepa"
+    affected_count = len(affected_contracts)
+
+    related = related_object_fields(price_list)
+    notifications = []
+    for parent_id, is_sepa in parent_sepa.items():
+        priority = "critical" if is_sepa else "high"
+
+        notifications.append(
+            Notification(
+                recipient_id=parent_id,
+                notification_type="price_change",
+                priority=priority,
+                title=f"Preisaenderung - {price_list.subject.name}",
+                message=f"Der Preis fuer {price_list.subject.name} wurde auf {price_list.price_per_hour}€ pro Stunde geaendert, gueltig ab {price_list.valid_from}",
+                requires_acknowledgment=(priority == "critical"),
+                **related,
+            )
         )
 
     # Уведомляем бухгалтеров
-    from django.contrib.auth.models import User
-
-    accountants = User.objects.filter(userprofile__role="accountant")
-    for accountant in accountants:
-        Notification.objects.create(
-            recipient=accountant,
+    accountant_ids = User.objects.filter(userprofile__role="accountant").values_list(
+        "id", flat=True
+    )
+    notifications += [
+        Notification(
+            recipient_id=accountant_id,
             notification_type="price_change",
             priority="normal",
             title=f"Preisaenderung - {price_list.subject.name}",
-            message=f"Neuer Preis: {price_list.price_per_hour}€/Std., {len(affected_contracts)} Vertraege betroffen",
-            content_object=price_list,
+            message=f"Neuer Preis: {price_list.price_per_hour}€/Std., {affected_count} Vertraege betroffen",
+            **related,
         )
+        for accountant_id in accountant_ids
+    ]
+
+    bulk_notify(notifications)
 
 
 def notify_absence(absence_record):
@@ -246,50 +325,64 @@ def notify_contract_request_status(request, processed_by):
         message = f"Status Ihres Antrags: {request.get_status_display()}"
         priority = "normal"
 
+    related = related_object_fields(request)
+
     # Уведомляем родителя
-    Notification.objects.create(
-        recipient=parent,
-        notification_type="request_status",
-        priority=priority,
-        title=title,
-        message=message,
-        content_object=request,
-    )
+    notifications = [
+        Notification(
+            recipient=parent,
+            notification_type="request_status",
+            priority=priority,
+            title=title,
+            message=message,
+            **related,
+        )
+    ]
 
     # Уведомляем бухгалтеров о принятых заявках
     if request.status == "approved":
-        from django.contrib.auth.models import User
-
-        accountants = User.objects.filter(userprofile__role="accountant")
-        for accountant in accountants:
-            Notification.objects.create(
-                recipient=accountant,
+        accountant_ids = User.objects.filter(
+            userprofile__role="accountant"
+        ).values_list("id", flat=True)
+        notifications += [
+            Notification(
+                recipient_id=accountant_id,
                 notification_type="request_status",
                 priority="normal",
                 title=f"Antrag genehmigt - {parent.get_full_name()}",
                 message=f"Antrag von {parent.get_full_name()} wurde genehmigt von {processed_by.get_full_name()}: {request.description}",
-                content_object=request,
+                **related,
             )
+            for accountant_id in accountant_ids
+        ]
+
+    bulk_notify(notifications)
 
 
 def notify_new_contract_request(request):
     """
     Уведомляет администраторов о новой заявке на изменение контракта
     """
-    from django.contrib.auth.models import User
+    related = related_object_fields(request)
 
     # Уведомляем всех администраторов
-    admins = User.objects.filter(userprofile__role__in=["admin", "accountant"])
-
-    for admin in admins:
-        Notification.objects.create(
-            recipient=admin,
-            notification_type="request_status",
-            priority="high",
-            title=f"Neuer Antrag - {request.get_request_type_display()}",
-            message=f"Neuer Antrag von {request.parent.get_full_name()}: {request.description}",
-            content_object=request,
-        )
+    admin_ids = User.objects.filter(
+        userprofile__role__in=["admin", "accountant"]
+    ).values_list("id", flat=True)
+
+    bulk_notify(
+        [
+            Notification(
+                recipient_id=admin_id,
+                notification_type="request_status",
+                priority="high",
+                title=f"Neuer Antrag - {request.get_request_type_display()}",
+                message=f"Neuer Antrag von {request.parent.get_full_name()}: {request.description}",
+                **related,
+            )
+            for admin_id in admin_ids
+        ]
+    )
 
 
 def notify_schedule_change(group, change_description, changed_by):
@@ -299,30 +392,39 @@ def notify_schedule_change(group, change_description, changed_by):
     # Находим всех родителей детей в группе
     from lessons.models import GroupEnrollment
 
-    enrollments = GroupEnrollment.objects.filter(
-        group=group, status="active"
-    ).select_related("child__parent")
-
-    for enrollment in enrollments:
-        parent = enrollment.child.parent
-
-        Notification.objects.create(
-            recipient=parent,
+    rows = GroupEnrollment.objects.filter(group=group, status="active").values_list(
+        "child__parent_id", "child__user_id", "child__user__is_active"
+    )
+    parent_ids = set()
+    child_user_ids = set()
+    for parent_id, child_user_id, child_is_active in rows:
+        parent_ids.add(parent_id)
+        # Также уведомляем детей с активным аккаунтом
+        if child_is_active:
+            child_user_ids.add(child_user_id)
+
+    related = related_object_fields(group)
+    notifications = [
+        Notification(
+            recipient_id=parent_id,
             notification_type="schedule_change",
             priority="high",
             title=f"Stundenplanaenderung - {group.name}",
             message=f"Der Stundenplan fuer die Gruppe {group.name} wurde geaendert: {change_description}",
-            content_object=group,
+            **related,
         )
+        for parent_id in parent_ids
+    ]
+    notifications += [
+        Notification(
+            recipient_id=child_user_id,
+            notification_type="schedule_change",
+            priority="high",
+            title=f"Stundenplanaenderung - {group.name}",
+            message=f"Der Stundenplan fuer deine Gruppe {group.name} wurde geaendert: {change_description}",
+            **related,
+        )
+        for child_user_id in child_user_ids
+    ]
 
-        # Также уведомляем детей
-        child_user = enrollment.child.user
-        if child_user.is_active:
-            Notification.objects.create(
-                recipient=child_user,
-                notification_type="schedule_change",
-                priority="high",
-                title=f"Stundenplanaenderung - {group.name}",
-                message=f"Der Stundenplan fuer deine Gruppe {group.name} wurde geaendert: {change_description}",
-                content_object=group,
-            )
+    bulk_notify(notifications)
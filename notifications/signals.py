@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_notification_counts
+from .models import Notification
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def reset_notification_counts(sender, instance, **kwargs):
+    """Сбрасывает кэш счетчиков уведомлений получателя"""
+    invalidate_notification_counts(instance.recipient_id)
@@ -0,0 +1,25 @@
+from celery import shared_task
+
+from .models import Notification, bulk_notify, notify_new_contract_request
+
+
+@shared_task
+def notify_new_contract_request_task(request_id):
+    """Уведомляет администраторов о новой заявке (в фоне)"""
+    from contracts.models import ContractChangeRequest
+
+    change_request = ContractChangeRequest.objects.select_related("parent").get(
+        id=request_id
+    )
+    notify_new_contract_request(change_request)
+
+
+@shared_task
+def dispatch_bulk_notification(payload, recipient_ids):
+    """Создает одинаковое уведомление для списка получателей (в фоне)"""
+    bulk_notify(
+        [
+            Notification(recipient_id=recipient_id, **payload)
+            for recipient_id in recipient_ids
+        ]
+    )
@@ -1,3 +1,68 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from clients.models import UserProfile
+
+from .models import Notification
+from .views import MANAGEMENT_PAGE_SIZE
+
+
+class ManagementKeysetPaginationTests(TestCase):
+    """Постраничный вывод управления уведомлениями по ключу (created_at, id)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin")
+        UserProfile.objects.create(user=cls.admin, role="admin")
+        now = timezone.now()
+        # Часть записей делит одно время создания, порядок решает id
+        notifications = Notification.objects.bulk_create(
+            Notification(recipient=cls.admin, title=f"N{i}", message="Text")
+            for i in range(MANAGEMENT_PAGE_SIZE * 2 + 5)
+        )
+        for i, notification in enumerate(notifications):
+            Notification.objects.filter(pk=notification.pk).update(
+                created_at=now - timedelta(minutes=i // 3),
+                is_read=bool(i % 2),
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def walk_pages(self, query=""):
+        """Проходит все страницы по ссылке «Ältere» и собирает id"""
+        url = reverse("notifications:management")
+        seen = []
+        while True:
+            context = self.client.get(f"{url}?{query}").context
+            seen.extend(notification.id for notification in context["notifications"])
+            if not context["has_next"]:
+                return seen
+            query = context["next_query"]
+
+    def test_pages_cover_every_notification_once_in_order(self):
+        expected = list(
+            Notification.objects.order_by("-created_at", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(self.walk_pages(), expected)
+
+    def test_filters_are_kept_across_pages(self):
+        expected = list(
+            Notification.objects.filter(is_read=False)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(self.walk_pages("status=unread"), expected)
 
-# Create your tests here.
+    def test_invalid_cursor_shows_first_page(self):
+        url = reverse("notifications:management")
+        for query in ["before=abc&before_id=1", "before=2024-01-01T00:00&before_id=²"]:
+            response = self.client.get(f"{url}?{query}")
+            self.assertEqual(response.status_code, 200, query)
+            self.assertTrue(response.context["is_first_page"], query)
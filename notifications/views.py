@@ -1,86 +1,108 @@
 # notifications/views.py
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Count, Q
-from django.http import JsonResponse
+from django.db.models.functions import TruncDate
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_POST
 
+from educational_center.json_utils import json_response
+
+from .cache import get_notification_counts_cached
 from .forms import SendNotificationForm
-from .models import Notification
+from .models import Notification, bulk_notify
+from .tasks import dispatch_bulk_notification
+
+
+# Размер страницы списка управления уведомлениями
+MANAGEMENT_PAGE_SIZE = 50
 
 
 def is_admin_or_accountant(user):
-    """Проверка, является ли пользователь администратором или бухгалтером"""
-    return (
-        user.is_authenticated
-        and hasattr(user, "userprofile")
-        and user.userprofile.role in ["admin", "accountant"]
-    )
+    """Проверка, является ли пользователь администратором или бухгалтером
+
+    Профиль загружается вместе с пользователем (ProfileModelBackend),
+    поэтому проверка роли не делает отдельного запроса.
+    """
+    profile = getattr(user, "userprofile", None)
+    return profile is not None and profile.role in ["admin", "accountant"]
 
 
 @login_required
 def unread_notifications_count(request):
     """API endpoint для получения количества непрочитанных уведомлений"""
-    count = Notification.objects.filter(recipient=request.user, is_read=False).count()
-
-    critical_count = Notification.objects.filter(
-        recipient=request.user,
-        priority="critical",
-        requires_acknowledgment=True,
-        acknowledged_at__isnull=True,
-    ).count()
+    counts = get_notification_counts_cached(request.user.id)
 
-    return JsonResponse({"unread_count": count, "critical_count": critical_count})
+    return json_response(
+        {"unread_count": counts["unread"], "critical_count": counts["critical"]}
+    )
 
 
 @login_required
 def latest_notifications(request):
     """API endpoint для получения последних уведомлений"""
-    notifications = Notification.objects.filter(recipient=request.user).order_by(
-        "-created_at"
-    )[:10]
+    notifications = (
+        Notification.objects.filter(recipient=request.user)
+        .order_by("-created_at")
+        .values(
+            "id",
+            "title",
+            "message",
+            "is_read",
+            "priority",
+            "notification_type",
+            "created_at",
+            "requires_acknowledgment",
+            "acknowledged_at",
+        )[:10]
+    )
 
+    # Строки собираются из values() без создания экземпляров моделей
+    type_labels = Notification._TYPE_MAP
     notifications_data = []
     for notification in notifications:
         notifications_data.append(
             {
-                "id": notification.id,
-                "title": notification.title,
+                "id": notification["id"],
+                "title": notification["title"],
                 "message": (
-                    notification.message[:100] + "..."
-                    if len(notification.message) > 100
-                    else notification.message
+                    notification["message"][:100] + "..."
+                    if len(notification["message"]) > 100
+                    else notification["message"]
+                ),
+                "is_read": notification["is_read"],
+                "priority": notification["priority"],
+                "notification_type": type_labels.get(
+                    notification["notification_type"],
+                    notification["notification_type"],
                 ),
-                "is_read": notification.is_read,
-                "priority": notification.priority,
-                "notification_type": notification.get_notification_type_display(),
-                "created_at": notification.created_at.strftime("%d.%m.%Y %H:%M"),
-                "requires_acknowledgment": notification.requires_acknowledgment,
+                "created_at": notification["created_at"].strftime("%d.%m.%Y %H:%M"),
+                "requires_acknowledgment": notification["requires_acknowledgment"],
                 "acknowledged_at": (
-                    notification.acknowledged_at.strftime("%d.%m.%Y %H:%M")
-                    if notification.acknowledged_at
+                    notification["acknowledged_at"].strftime("%d.%m.%Y %H:%M")
+                    if notification["acknowledged_at"]
                     else None
                 ),
             }
         )
 
-    return JsonResponse({"notifications": notifications_data})
+    return json_response({"notifications": notifications_data})
 
 
 @login_required
 @require_POST
 def mark_all_read(request):
     """Отмечает все уведомления пользователя как прочитанные"""
-    updated_count = Notification.objects.filter(
-        recipient=request.user, is_read=False
-    ).update(is_read=True, read_at=timezone.now())
+    updated_count = Notification.objects.filter(recipient=request.user).mark_read()
 
-    return JsonResponse({"success": True, "updated_count": updated_count})
+    return json_response({"success": True, "updated_count": updated_count})
 
 
 @user_passes_test(is_admin_or_accountant)
@@ -101,24 +123,45 @@ def notification_stats_view(request):
     )
 
     # Статистика по пользователям с наибольшим количеством непрочитанных
-    user_stats = (
+    # Группировка только по recipient_id, имена подгружаются вторым запросом
+    unread_by_recipient = list(
         Notification.objects.filter(is_read=False)
-        .values(
-            "recipient__first_name",
-            "recipient__last_name",
-            "recipient__userprofile__role",
-        )
+        .values("recipient_id")
         .annotate(unread_count=Count("id"))
         .order_by("-unread_count")[:10]
     )
+    recipients = User.objects.only("id", "first_name", "last_name").in_bulk(
+        [row["recipient_id"] for row in unread_by_recipient]
+    )
+    user_stats = [
+        {
+            "recipient": recipients[row["recipient_id"]],
+            "unread_count": row["unread_count"],
+        }
+        for row in unread_by_recipient
+    ]
 
     # Статистика за последние 7 дней
-    week_ago = datetime.now() - timedelta(days=7)
-    recent_stats = []
-    for i in range(7):
-        day = week_ago + timedelta(days=i)
-        day_count = Notification.objects.filter(created_at__date=day.date()).count()
-        recent_stats.append({"date": day.strftime("%d.%m"), "count": day_count})
+    week_ago = timezone.now() - timedelta(days=7)
+    days = [timezone.localdate(week_ago) + timedelta(days=i) for i in range(7)]
+    # Диапазон по самому created_at, а не по дате от него: работает индекс
+    period_start = timezone.make_aware(datetime.combine(days[0], time.min))
+    period_end = timezone.make_aware(
+        datetime.combine(days[-1] + timedelta(days=1), time.min)
+    )
+    daily_counts = dict(
+        Notification.objects.filter(
+            created_at__gte=period_start, created_at__lt=period_end
+        )
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(count=Count("id"))
+        .values_list("day", "count")
+    )
+    recent_stats = [
+        {"date": day.strftime("%d.%m"), "count": daily_counts.get(day, 0)}
+        for day in days
+    ]
 
     # Критичные непрочитанные уведомления
     critical_notifications = (
@@ -153,10 +196,9 @@ def send_notification_view(request):
         if form.is_valid():
             recipients = form.cleaned_data["recipients"]
 
-            created_count = 0
-            for recipient in recipients:
-                Notification.objects.create(
-                    recipient=recipient,
+            notifications = [
+                Notification(
+                    recipient_id=recipient.id,
                     notification_type=form.cleaned_data["notification_type"],
                     priority=form.cleaned_data["priority"],
                     title=form.cleaned_data["title"],
@@ -166,7 +208,10 @@ def send_notification_view(request):
                         "requires_acknowledgment"
                     ],
                 )
-                created_count += 1
+                for recipient in recipients
+            ]
+            bulk_notify(notifications)
+            created_count = len(notifications)
 
             messages.success(
                 request, f"Benachrichtigung an {created_count} Empfänger gesendet."
@@ -197,22 +242,25 @@ def bulk_send_notifications(request):
             return redirect("notifications:bulk_send")
 
         # Получаем пользователей по ролям
-        recipients = User.objects.filter(
-            userprofile__role__in=recipient_roles, is_active=True
+        recipient_ids = list(
+            User.objects.filter(
+                userprofile__role__in=recipient_roles, is_active=True
+            ).values_list("id", flat=True)
         )
 
-        created_count = 0
-        for recipient in recipients:
-            Notification.objects.create(
-                recipient=recipient,
-                notification_type=notification_type,
-                priority=priority,
-                title=title,
-                message=message,
-                is_important=is_important,
-                requires_acknowledgment=requires_acknowledgment,
-            )
-            created_count += 1
+        # Уведомления создаются в фоне после фиксации транзакции
+        payload = {
+            "notification_type": notification_type,
+            "priority": priority,
+            "title": title,
+            "message": message,
+            "is_important": is_important,
+            "requires_acknowledgment": requires_acknowledgment,
+        }
+        transaction.on_commit(
+            lambda: dispatch_bulk_notification.delay(payload, recipient_ids)
+        )
+        created_count = len(recipient_ids)
 
         messages.success(
             request, f"Massenbenachrichtigung an {created_count} Empfänger gesendet."
@@ -240,8 +288,21 @@ def notification_management(request):
     type_filter = request.GET.get("type", "all")
     priority_filter = request.GET.get("priority", "all")
 
+    # Текст сообщения и служебные поля пользователя в списке не выводятся
     notifications = Notification.objects.select_related(
         "recipient", "recipient__userprofile"
+    ).only(
+        "title",
+        "notification_type",
+        "priority",
+        "is_read",
+        "is_important",
+        "requires_acknowledgment",
+        "acknowledged_at",
+        "created_at",
+        "recipient__first_name",
+        "recipient__last_name",
+        "recipient__userprofile__role",
     )
 
     # Применяем фильтры
@@ -260,18 +321,43 @@ def notification_management(request):
     if priority_filter != "all":
         notifications = notifications.filter(priority=priority_filter)
 
-    notifications = notifications.order_by("-created_at")
+    total_count = notifications.count()
+
+    # Постраничный вывод по ключу (created_at, id) вместо OFFSET: страница
+    # продолжается после последней показанной записи
+    params = request.GET.copy()
+    before = params.pop("before", [""])[0]
+    before_id = params.pop("before_id", [""])[0]
+    try:
+        before, before_id = parse_datetime(before), int(before_id)
+    except ValueError:
+        before = before_id = None
+    is_first_page = not (before and before_id)
+    if not is_first_page:
+        notifications = notifications.filter(
+            Q(created_at__lt=before) | Q(created_at=before, id__lt=before_id)
+        )
 
-    # Пагинация
-    from django.core.paginator import Paginator
+    notifications = list(
+        notifications.order_by("-created_at", "-id")[: MANAGEMENT_PAGE_SIZE + 1]
+    )
+    has_next = len(notifications) > MANAGEMENT_PAGE_SIZE
+    notifications = notifications[:MANAGEMENT_PAGE_SIZE]
 
-    paginator = Paginator(notifications, 50)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    first_query = params.urlencode()
+    if has_next:
+        params["before"] = notifications[-1].created_at.isoformat()
+        params["before_id"] = notifications[-1].id
+    next_query = params.urlencode()
 
     context = {
         "title": "Benachrichtigungsverwaltung",
-        "page_obj": page_obj,
+        "notifications": notifications,
+        "total_count": total_count,
+        "is_first_page": is_first_page,
+        "has_next": has_next,
+        "first_query": first_query,
+        "next_query": next_query,
         "status_filter": status_filter,
         "type_filter": type_filter,
         "priority_filter": priority_filter,
@@ -299,29 +385,44 @@ def delete_notification(request, notification_id):
 @require_POST
 def send_reminder(request, notification_id):
     """Отправка напоминания о критичном уведомлении"""
-    original_notification = get_object_or_404(
-        Notification,
-        id=notification_id,
-        priority="critical",
-        requires_acknowledgment=True,
-        acknowledged_at__isnull=True,
+    # Одно чтение нужных полей вместо загрузки уведомления, получателя и объекта
+    original = (
+        Notification.objects.filter(
+            id=notification_id,
+            priority="critical",
+            requires_acknowledgment=True,
+            acknowledged_at__isnull=True,
+        )
+        .values(
+            "recipient_id",
+            "recipient__first_name",
+            "recipient__last_name",
+            "title",
+            "message",
+            "content_type_id",
+            "object_id",
+        )
+        .first()
     )
+    if original is None:
+        raise Http404
 
-    # Создаем напоминание
+    # Создаем напоминание; связанный объект копируется по ключам без загрузки
     Notification.objects.create(
-        recipient=original_notification.recipient,
+        recipient_id=original["recipient_id"],
         notification_type="general",
         priority="critical",
-        title=f"ERINNERUNG: {original_notification.title}",
-        message=f"Sie haben eine wichtige Benachrichtigung noch nicht bestätigt:\n\n{original_notification.message}",
+        title=f"ERINNERUNG: {original['title']}",
+        message=f"Sie haben eine wichtige Benachrichtigung noch nicht bestätigt:\n\n{original['message']}",
         requires_acknowledgment=True,
-        content_object=original_notification.content_object,
+        content_type_id=original["content_type_id"],
+        object_id=original["object_id"],
     )
 
-    messages.success(
-        request,
-        f"Erinnerung an {original_notification.recipient.get_full_name()} gesendet.",
-    )
+    recipient_name = (
+        f"{original['recipient__first_name']} {original['recipient__last_name']}"
+    ).strip()
+    messages.success(request, f"Erinnerung an {recipient_name} gesendet.")
     return redirect("notifications:management")
 
 
@@ -387,10 +488,12 @@ def user_notification_settings(request):
 @login_required
 def notifications_index_view(request):
     """Главная страница уведомлений"""
-    # Получаем уведомления пользователя
-    notifications = Notification.objects.filter(recipient=request.user).order_by(
-        "-created_at"
-    )[:20]
+    # Получаем уведомления пользователя только с выводимыми на странице полями
+    notifications = (
+        Notification.objects.filter(recipient=request.user)
+        .only("title", "message", "priority", "is_read", "created_at")
+        .order_by("-created_at")[:20]
+    )
 
     context = {
         "notifications": notifications,